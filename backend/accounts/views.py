@@ -13,6 +13,7 @@ from .serializers import (
     ChangePasswordSerializer, ForgotPasswordSerializer, ResetPasswordSerializer
 )
 from .models import User, PasswordResetOTP
+from cart.guest import GUEST_CART_HEADER, merge_guest_cart
 
 
 @api_view(['POST'])
@@ -21,6 +22,7 @@ def register(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
+        merge_guest_cart(user, request.headers.get(GUEST_CART_HEADER))
         refresh = RefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
@@ -46,6 +48,7 @@ def login(request):
         # Authenticate using phone_number as username (since USERNAME_FIELD is phone_number)
         user = authenticate(username=phone_number, password=password)
         if user:
+            merge_guest_cart(user, request.headers.get(GUEST_CART_HEADER))
             refresh = RefreshToken.for_user(user)
             return Response({
                 'user': UserSerializer(user).data,
@@ -8,6 +8,9 @@ class CartItemInline(admin.TabularInline):
     readonly_fields = ('product', 'quantity', 'total_price')
     can_delete = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
@@ -17,7 +20,7 @@ class CartAdmin(admin.ModelAdmin):
     inlines = [CartItemInline]
     date_hierarchy = 'created_at'
     list_per_page = 25
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('total_items', 'total_price', 'created_at', 'updated_at')
     
     fieldsets = (
         ('Cart Information', {
@@ -29,6 +32,18 @@ class CartAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Totals for every row come from one grouped query instead of a loop per cart
+        return super().get_queryset(request).select_related('user').with_totals()
+
+    @admin.display(ordering='annotated_total_items')
+    def total_items(self, obj):
+        return obj.total_items
+
+    @admin.display(ordering='annotated_total_price')
+    def total_price(self, obj):
+        return obj.total_price
+
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
@@ -36,6 +51,7 @@ class CartItemAdmin(admin.ModelAdmin):
     list_filter = ('created_at', 'updated_at', 'product__category')
     search_fields = ('cart__user__email', 'product__name')
     readonly_fields = ('cart', 'product', 'quantity', 'total_price', 'created_at', 'updated_at')
+    list_select_related = ('cart__user', 'product')
     list_per_page = 25
     
     fieldsets = (
@@ -0,0 +1,89 @@
+"""
+Guest carts for anonymous shoppers.
+
+A guest cart is a ``{product_id: quantity}`` dict in the cache backend,
+not a database row. It is identified by a signed token that the client
+keeps and sends back in the ``X-Cart-Token`` header. Each write extends the
+entry's lifetime to GUEST_CART_TIMEOUT seconds. At login or registration
+the guest cart is merged into the user's Cart with a single bulk upsert
+and then dropped.
+"""
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from products.models import Product
+from .models import Cart, CartItem
+from .summary import invalidate_cart_summary
+
+GUEST_CART_HEADER = 'X-Cart-Token'
+GUEST_CART_SALT = 'cart.guest'
+# Distinct products a guest cart may hold, to bound the cache entry
+MAX_GUEST_CART_ITEMS = 100
+
+
+def new_guest_token():
+    return signing.Signer(salt=GUEST_CART_SALT).sign(uuid.uuid4().hex)
+
+
+def guest_cart_id(token):
+    """The cart id inside a signed token, or None if it is missing or forged."""
+    if not token:
+        return None
+    try:
+        return signing.Signer(salt=GUEST_CART_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+
+
+def guest_cart_key(cart_id):
+    return f'cart:guest:{cart_id}'
+
+
+def get_guest_items(token):
+    cart_id = guest_cart_id(token)
+    if cart_id is None:
+        return {}
+    return cache.get(guest_cart_key(cart_id)) or {}
+
+
+def save_guest_items(token, items):
+    cache.set(guest_cart_key(guest_cart_id(token)), items, settings.GUEST_CART_TIMEOUT)
+
+
+def merge_guest_cart(user, token):
+    """
+    Fold a guest cart into ``user``'s Cart. Quantities of products already in
+    the cart are added together and capped at the available stock, and
+    inactive or sold-out products are dropped. Returns the number of
+    products merged.
+    """
+    cart_id = guest_cart_id(token)
+    if cart_id is None:
+        return 0
+    items = cache.get(guest_cart_key(cart_id))
+    if not items:
+        return 0
+
+    with transaction.atomic():
+        cart, created = Cart.objects.get_or_create(user=user)
+        stock = dict(
+            Product.objects.filter(id__in=items, is_active=True, stock__gt=0).values_list('id', 'stock')
+        )
+        existing = dict(cart.items.filter(product_id__in=stock).values_list('product_id', 'quantity'))
+        merged = [
+            CartItem(cart=cart, product_id=product_id,
+                     quantity=min(existing.get(product_id, 0) + quantity, stock[product_id]))
+            # quantity > 0 also keeps a corrupt cache entry from failing the login
+            for product_id, quantity in items.items() if product_id in stock and quantity > 0
+        ]
+        CartItem.objects.bulk_create(
+            merged, update_conflicts=True, unique_fields=['cart', 'product'],
+            update_fields=['quantity', 'updated_at'],
+        )
+
+    cache.delete(guest_cart_key(cart_id))
+    invalidate_cart_summary(user.pk)
+    return len(merged)
@@ -1,23 +1,62 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
 from accounts.models import User
 from products.models import Product
 
+TOTAL_PRICE_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate each cart with its item count and total price, for list pages."""
+        return self.annotate(
+            annotated_total_items=Coalesce(Sum('items__quantity'), 0),
+            annotated_total_price=Coalesce(
+                Sum(F('items__quantity') * F('items__product__final_price'), output_field=TOTAL_PRICE_FIELD),
+                Value(Decimal('0')), output_field=TOTAL_PRICE_FIELD,
+            ),
+        )
+
 
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
     def __str__(self):
         return f"Cart for {self.user.email}"
 
+    @cached_property
+    def totals(self):
+        """
+        Item count and total price. Annotations from with_totals() are used
+        when present; prefetched items are summed when the cart was loaded
+        with them, and otherwise one aggregate query is run. Computed once
+        per instance, so reload the cart after changing its items.
+        """
+        if hasattr(self, 'annotated_total_items'):
+            return {'total_items': self.annotated_total_items, 'total_price': self.annotated_total_price}
+        items = getattr(self, '_prefetched_objects_cache', {}).get('items')
+        if items is not None:
+            return {
+                'total_items': sum(item.quantity for item in items),
+                'total_price': sum((item.total_price for item in items), Decimal('0')),
+            }
+        return cart_totals(self.items.all())
+
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.totals['total_items']
 
     @property
     def total_price(self):
-        return sum(item.total_price for item in self.items.all())
+        return self.totals['total_price']
 
 
 class CartItem(models.Model):
@@ -37,3 +76,18 @@ class CartItem(models.Model):
     def total_price(self):
         return self.product.final_price * self.quantity
 
+
+def cart_totals(items, **aggregates):
+    """
+    ``total_items`` and ``total_price`` of a CartItem queryset, summed in one
+    aggregate query over each product's final price. Extra ``aggregates``
+    are computed in the same query and returned as they are.
+    """
+    totals = items.aggregate(
+        total_items=Sum('quantity'),
+        total_price=Sum(F('quantity') * F('product__final_price'), output_field=TOTAL_PRICE_FIELD),
+        **aggregates,
+    )
+    totals['total_items'] = totals['total_items'] or 0
+    totals['total_price'] = totals['total_price'] or Decimal('0')
+    return totals
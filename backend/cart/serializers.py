@@ -1,11 +1,13 @@
 from rest_framework import serializers
+from nextbloom.fieldsets import SparseFieldsetMixin
 from products.serializers import ProductListSerializer
 from products.models import Product
 from .models import Cart, CartItem
 
 
-class CartItemSerializer(serializers.ModelSerializer):
-    product = serializers.SerializerMethodField()
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Nested rather than built per item, so the product field tree is set up once per response
+    product = ProductListSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), 
                                                      source='product', write_only=True)
     total_price = serializers.ReadOnlyField()
@@ -14,11 +16,11 @@ class CartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = ('id', 'product', 'product_id', 'quantity', 'total_price', 'created_at', 'updated_at')
 
-    def get_product(self, obj):
-        return ProductListSerializer(obj.product, context=self.context).data
+    expandable_fields = ('product',)
+    field_sources = {'total_price': ('product', 'quantity')}
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_items = serializers.ReadOnlyField()
     total_price = serializers.ReadOnlyField()
@@ -28,3 +30,30 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ('id', 'user', 'items', 'total_items', 'total_price', 'created_at', 'updated_at')
         read_only_fields = ('user',)
 
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'set', 'remove'])
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, default=1)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'add' and attrs['quantity'] < 1:
+            raise serializers.ValidationError({'quantity': 'Must be at least 1 when adding.'})
+        return attrs
+
+
+class GuestCartProductSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+
+
+class GuestCartAddSerializer(GuestCartProductSerializer):
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class GuestCartUpdateSerializer(GuestCartProductSerializer):
+    # 0 removes the item
+    quantity = serializers.IntegerField(min_value=0, default=1)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
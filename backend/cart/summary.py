@@ -0,0 +1,52 @@
+"""
+Cart summary for header badges.
+
+The summary holds ``total_items``, ``total_price`` and a ``version`` string
+that doubles as the ETag. It comes from one aggregate over the user's cart
+items and is cached per user for CART_SUMMARY_CACHE_TIMEOUT seconds.
+Anything that changes a cart calls invalidate_cart_summary(), so the cache
+only hides product price changes, and only until it expires.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from .models import CartItem, cart_totals
+
+
+def cart_summary_key(user_id):
+    return f'cart:summary:{user_id}'
+
+
+def compute_cart_summary(user):
+    totals = cart_totals(
+        CartItem.objects.filter(cart__user=user),
+        count=Count('id'), last_modified=Max('updated_at'),
+    )
+    # The count catches removed items, which the latest updated_at alone would miss
+    fingerprint = '|'.join([
+        str(user.pk),
+        str(totals['count']),
+        str(totals['total_items']),
+        str(totals['total_price']),
+        totals['last_modified'].isoformat() if totals['last_modified'] else '',
+    ])
+    return {
+        'total_items': totals['total_items'],
+        'total_price': totals['total_price'],
+        'version': hashlib.md5(fingerprint.encode('utf-8')).hexdigest(),
+    }
+
+
+def get_cart_summary(user):
+    key = cart_summary_key(user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_cart_summary(user)
+        cache.set(key, summary, settings.CART_SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_cart_summary(user_id):
+    cache.delete(cart_summary_key(user_id))
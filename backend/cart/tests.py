@@ -0,0 +1,159 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from products.models import Category, Product
+from .guest import guest_cart_id, guest_cart_key, new_guest_token
+from .models import Cart, CartItem
+
+CART_SIZES = (1, 10, 50)
+
+
+class GuestCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Guest Cart', slug='guest-cart')
+        cls.product = Product.objects.create(name='Guest cart product', slug='guest-cart-product',
+                                             description='guest cart', category=category, price=100, stock=10)
+        cls.user = User.objects.create_user(username='guest-cart', email='guest-cart@example.com',
+                                            phone_number='+919200000000', password='guest-cart')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.token = new_guest_token()
+        self.client.credentials(HTTP_X_CART_TOKEN=self.token)
+
+    def cached_items(self):
+        return cache.get(guest_cart_key(guest_cart_id(self.token))) or {}
+
+    def test_add_item_rejects_non_positive_and_non_numeric_input(self):
+        for data in ({'product_id': self.product.id, 'quantity': -3},
+                     {'product_id': self.product.id, 'quantity': 0},
+                     {'product_id': self.product.id, 'quantity': 'many'},
+                     {'product_id': 'abc'}):
+            response = self.client.post('/api/cart/guest/add_item/', data, format='json')
+            self.assertEqual(response.status_code, 400, data)
+        self.assertEqual(self.cached_items(), {})
+
+    def test_update_item_validates_quantity_and_zero_removes(self):
+        self.client.post('/api/cart/guest/add_item/', {'product_id': self.product.id, 'quantity': 2}, format='json')
+        for data in ({'product_id': self.product.id, 'quantity': -1},
+                     {'product_id': self.product.id, 'quantity': 'x'},
+                     {'product_id': 'x', 'quantity': 1}):
+            response = self.client.put('/api/cart/guest/update_item/', data, format='json')
+            self.assertEqual(response.status_code, 400, data)
+        self.assertEqual(self.cached_items(), {self.product.id: 2})
+
+        response = self.client.put('/api/cart/guest/update_item/',
+                                   {'product_id': self.product.id, 'quantity': 0}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cached_items(), {})
+
+    def test_remove_item_rejects_non_numeric_product_id(self):
+        response = self.client.delete('/api/cart/guest/remove_item/?product_id=abc')
+        self.assertEqual(response.status_code, 400)
+
+    def test_login_ignores_corrupt_guest_cart_lines(self):
+        cache.set(guest_cart_key(guest_cart_id(self.token)), {self.product.id: -3})
+        response = self.client.post('/api/auth/login/', {'phone_number': '+919200000000', 'password': 'guest-cart'},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(CartItem.objects.filter(cart__user=self.user).exists())
+
+    def test_login_merges_guest_cart(self):
+        self.client.post('/api/cart/guest/add_item/', {'product_id': self.product.id, 'quantity': 2}, format='json')
+        response = self.client.post('/api/auth/login/', {'phone_number': '+919200000000', 'password': 'guest-cart'},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(CartItem.objects.filter(cart__user=self.user).values_list('product_id', 'quantity')),
+            [(self.product.id, 2)],
+        )
+
+
+class CartQueryCountTests(TestCase):
+    """Every cart action runs the same number of queries for carts of 1, 10 and 50 items."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Cart Query Check', slug='cart-query-check')
+        cls.products = [
+            Product.objects.create(
+                name=f'Cart check {i}', slug=f'cart-check-{i}', description='cart check',
+                category=category, price=100 + i, discount_price=50 if i % 2 else None, stock=100,
+            )
+            for i in range(max(CART_SIZES) + 1)
+        ]
+
+    def count_queries(self, size):
+        products, extra = self.products[:size], self.products[-1]
+        user = User.objects.create_user(username=f'cart-check-{size}', email=f'cart-check-{size}@example.com',
+                                        phone_number=f'+91000000{size:04d}', password='cart-check')
+        cart = Cart.objects.create(user=user)
+        items = CartItem.objects.bulk_create(CartItem(cart=cart, product=product, quantity=1) for product in products)
+        client = APIClient()
+        client.force_authenticate(user)
+        requests = [
+            ('list', 'get', '/api/cart/', {}),
+            ('list ?expand=', 'get', '/api/cart/?expand=', {}),
+            ('add_item (new)', 'post', '/api/cart/add_item/', {'product_id': extra.id}),
+            ('add_item (existing)', 'post', '/api/cart/add_item/', {'product_id': products[0].id}),
+            ('update_item', 'put', '/api/cart/update_item/', {'item_id': items[0].id, 'quantity': 3}),
+            ('batch', 'post', '/api/cart/batch/', {'operations': [
+                {'op': 'set', 'product_id': product.id, 'quantity': 2} for product in products
+            ] + [{'op': 'remove', 'product_id': extra.id}]}),
+            ('remove_item', 'delete', f'/api/cart/remove_item/?item_id={items[0].id}', {}),
+            ('clear', 'delete', '/api/cart/clear/', {}),
+        ]
+        counts = {}
+        for action, method, url, data in requests:
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, method)(url, data, format='json')
+            self.assertLess(response.status_code, 400, f'{action}: {response.data}')
+            counts[action] = len(queries.captured_queries)
+        return counts
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        counts = {size: self.count_queries(size) for size in CART_SIZES}
+        for action in counts[CART_SIZES[0]]:
+            self.assertEqual(len({counts[size][action] for size in CART_SIZES}), 1,
+                             f'{action}: {[counts[size][action] for size in CART_SIZES]}')
+
+
+class CartBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Cart Batch', slug='cart-batch')
+        cls.retired = Product.objects.create(name='Retired product', slug='retired-product', description='batch',
+                                             category=category, price=100, stock=10)
+        cls.user = User.objects.create_user(username='cart-batch', email='cart-batch@example.com',
+                                            phone_number='+919300000000', password='cart-batch')
+
+    def setUp(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.retired, quantity=2)
+        Product.objects.filter(pk=self.retired.pk).update(is_active=False)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, *operations):
+        return self.client.post('/api/cart/batch/', {'operations': list(operations)}, format='json')
+
+    def test_deactivated_product_can_be_removed(self):
+        for operation in ({'op': 'remove', 'product_id': self.retired.id},
+                          {'op': 'set', 'product_id': self.retired.id, 'quantity': 0}):
+            CartItem.objects.get_or_create(cart=self.user.cart, product=self.retired, defaults={'quantity': 2})
+            response = self.batch(operation)
+            self.assertEqual(response.status_code, 200, operation)
+            self.assertFalse(CartItem.objects.filter(product=self.retired).exists(), operation)
+
+    def test_deactivated_product_cannot_be_added(self):
+        for operation in ({'op': 'add', 'product_id': self.retired.id, 'quantity': 1},
+                          {'op': 'set', 'product_id': self.retired.id, 'quantity': 1}):
+            response = self.batch(operation)
+            self.assertEqual(response.status_code, 404, operation)
+            self.assertEqual(response.data['product_ids'], [self.retired.id])
+        self.assertEqual(CartItem.objects.get(product=self.retired).quantity, 2)
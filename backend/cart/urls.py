@@ -3,6 +3,8 @@ from rest_framework.routers import DefaultRouter
 from . import views
 
 router = DefaultRouter()
+# Registered first so 'guest/' is not taken for a cart pk
+router.register(r'guest', views.GuestCartViewSet, basename='guest-cart')
 router.register(r'', views.CartViewSet, basename='cart')
 
 urlpatterns = [
@@ -1,10 +1,51 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, SAFE_METHODS
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from nextbloom.fieldsets import Fieldset
 from .models import Cart, CartItem
-from .serializers import CartSerializer, CartItemSerializer
+from .serializers import (
+    CartSerializer, CartItemSerializer, CartBatchSerializer,
+    GuestCartAddSerializer, GuestCartProductSerializer, GuestCartUpdateSerializer,
+)
+from .summary import get_cart_summary, invalidate_cart_summary
+from .guest import (
+    GUEST_CART_HEADER, MAX_GUEST_CART_ITEMS, get_guest_items, guest_cart_id, new_guest_token,
+    save_guest_items,
+)
+from products.list_rows import prepare_list
 from products.models import Product
+from products.serializers import ProductListSerializer
+
+
+def prefetch_cart(cart, fieldset=None):
+    """
+    Load the cart items together with their products in a single query,
+    ready for CartSerializer. The cart totals are then summed from the same
+    items. Only the item and product columns that ``fieldset`` renders are
+    read. When the items are not rendered nothing is prefetched, and the
+    totals come from one aggregate query instead.
+    """
+    fieldset = fieldset or Fieldset()
+    if not fieldset.includes('items'):
+        return cart
+
+    items_fieldset = fieldset.child('items')
+    product_columns = ['final_price']
+    if items_fieldset.renders('product'):
+        product_columns += ProductListSerializer.required_columns(items_fieldset.child('product'))
+    items = CartItem.objects.select_related('product').only(
+        'cart', 'product', 'quantity', *CartItemSerializer.required_columns(items_fieldset),
+        *(f'product__{column}' for column in product_columns),
+    )
+    prefetch_related_objects([cart], Prefetch('items', queryset=items))
+    return cart
 
 
 class CartViewSet(viewsets.ModelViewSet):
@@ -14,20 +55,48 @@ class CartViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Cart.objects.filter(user=self.request.user)
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Any write may have changed the cart, so drop the cached summary
+        if request.method not in SAFE_METHODS and request.user.is_authenticated:
+            invalidate_cart_summary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def cart_data(self, cart):
+        """Serialize ``cart`` with the fields the request asked for."""
+        fieldset = Fieldset.from_request(self.request)
+        serializer = CartSerializer(prefetch_cart(cart, fieldset), context={'request': self.request},
+                                    fieldset=fieldset)
+        return serializer.data
+
     def list(self, request, *args, **kwargs):
         cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = self.get_serializer(cart, context={'request': request})
-        return Response(serializer.data)
+        return Response(self.cart_data(cart))
 
     def retrieve(self, request, *args, **kwargs):
         cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = self.get_serializer(cart, context={'request': request})
-        return Response(serializer.data)
+        return Response(self.cart_data(cart))
 
     def get_object(self):
         cart, created = Cart.objects.get_or_create(user=self.request.user)
         return cart
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Item count and total price only, for header badges. Answers 304 when
+        the client's If-None-Match still matches the cart version.
+        """
+        summary = get_cart_summary(request.user)
+        etag = '"%s"' % summary['version']
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = Response(summary)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
     @action(detail=False, methods=['post'])
     def add_item(self, request):
         cart, created = Cart.objects.get_or_create(user=request.user)
@@ -54,8 +123,80 @@ class CartViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'Insufficient stock'}, status=status.HTTP_400_BAD_REQUEST)
             cart_item.save()
 
-        serializer = CartSerializer(cart, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(self.cart_data(cart), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Apply a list of ``add``/``set``/``remove`` operations, keyed by
+        product_id, in one transaction. ``set`` with quantity 0 removes the
+        item. Stock is checked against the final quantities; if any
+        operation fails, nothing is written.
+        """
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+        product_ids = {operation['product_id'] for operation in operations}
+        # Removals also apply to products deactivated since they were added; only adding needs an active product
+        adding = {
+            operation['product_id'] for operation in operations
+            if operation['op'] == 'add' or (operation['op'] == 'set' and operation['quantity'] > 0)
+        }
+
+        with transaction.atomic():
+            cart, created = Cart.objects.get_or_create(user=request.user)
+            stock = {}
+            inactive = set()
+            for product_id, product_stock, is_active in (
+                Product.objects.filter(id__in=product_ids).values_list('id', 'stock', 'is_active')
+            ):
+                stock[product_id] = product_stock
+                if not is_active:
+                    inactive.add(product_id)
+            missing = sorted((product_ids - stock.keys()) | (adding & inactive))
+            if missing:
+                return Response({'error': 'Product not found', 'product_ids': missing},
+                                status=status.HTTP_404_NOT_FOUND)
+
+            items = {item.product_id: item for item in cart.items.filter(product_id__in=product_ids)}
+            quantities = {product_id: item.quantity for product_id, item in items.items()}
+            for operation in operations:
+                product_id = operation['product_id']
+                if operation['op'] == 'add':
+                    quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+                elif operation['op'] == 'set':
+                    quantities[product_id] = operation['quantity']
+                else:
+                    quantities[product_id] = 0
+
+            short = sorted(product_id for product_id, quantity in quantities.items() if quantity > stock[product_id])
+            if short:
+                return Response({'error': 'Insufficient stock', 'product_ids': short},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            now = timezone.now()
+            to_create, to_update, to_delete = [], [], []
+            for product_id, quantity in quantities.items():
+                item = items.get(product_id)
+                if item is None:
+                    if quantity > 0:
+                        to_create.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+                elif quantity <= 0:
+                    to_delete.append(item.id)
+                elif quantity != item.quantity:
+                    item.quantity = quantity
+                    # bulk_update() does not apply auto_now
+                    item.updated_at = now
+                    to_update.append(item)
+
+            if to_create:
+                CartItem.objects.bulk_create(to_create)
+            if to_update:
+                CartItem.objects.bulk_update(to_update, ['quantity', 'updated_at'])
+            if to_delete:
+                CartItem.objects.filter(id__in=to_delete).delete()
+
+        return Response(self.cart_data(cart), status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['put'])
     def update_item(self, request):
@@ -64,7 +205,7 @@ class CartViewSet(viewsets.ModelViewSet):
         quantity = int(request.data.get('quantity', 1))
 
         try:
-            cart_item = CartItem.objects.get(id=item_id, cart=cart)
+            cart_item = CartItem.objects.select_related('product').get(id=item_id, cart=cart)
         except CartItem.DoesNotExist:
             return Response({'error': 'Item not found in cart'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -73,14 +214,12 @@ class CartViewSet(viewsets.ModelViewSet):
 
         if quantity <= 0:
             cart_item.delete()
-            serializer = CartSerializer(cart)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(self.cart_data(cart), status=status.HTTP_200_OK)
 
         cart_item.quantity = quantity
         cart_item.save()
 
-        serializer = CartSerializer(cart, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(self.cart_data(cart), status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['delete'])
     def remove_item(self, request):
@@ -90,8 +229,7 @@ class CartViewSet(viewsets.ModelViewSet):
         try:
             cart_item = CartItem.objects.get(id=item_id, cart=cart)
             cart_item.delete()
-            serializer = CartSerializer(cart)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(self.cart_data(cart), status=status.HTTP_200_OK)
         except CartItem.DoesNotExist:
             return Response({'error': 'Item not found in cart'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -99,6 +237,119 @@ class CartViewSet(viewsets.ModelViewSet):
     def clear(self, request):
         cart, created = Cart.objects.get_or_create(user=request.user)
         cart.items.all().delete()
-        serializer = CartSerializer(cart, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(self.cart_data(cart), status=status.HTTP_200_OK)
+
+
+class GuestCartViewSet(viewsets.ViewSet):
+    """
+    Cart for anonymous shoppers, kept in the cache rather than the database.
+    Items are addressed by product_id. The first write issues a token,
+    returned as ``guest_token``, which the client sends back in the
+    X-Cart-Token header and at login/registration to merge the cart.
+    """
+    permission_classes = [AllowAny]
+    # Guest traffic never needs the JWT user lookup
+    authentication_classes = []
+
+    def get_token(self, request):
+        token = request.headers.get(GUEST_CART_HEADER)
+        return token if guest_cart_id(token) else None
+
+    def cart_response(self, request, token, items):
+        lines = {}
+        if items:
+            products = Product.objects.filter(id__in=items, is_active=True)
+            rows, render = prepare_list(products, ProductListSerializer, {'request': request},
+                                        extra_columns=('final_price',))
+            for row in rows:
+                product_id, final_price = (
+                    (row['id'], row['final_price']) if isinstance(row, dict) else (row.id, row.final_price)
+                )
+                quantity = items[product_id]
+                lines[product_id] = {
+                    'product': render(row),
+                    'quantity': quantity,
+                    'total_price': final_price * quantity,
+                }
+        # Keep the order items were added in; products no longer active drop out
+        lines = [lines[product_id] for product_id in items if product_id in lines]
+        return Response({
+            'guest_token': token,
+            'items': lines,
+            'total_items': sum(line['quantity'] for line in lines),
+            'total_price': sum((line['total_price'] for line in lines), Decimal('0')),
+        })
+
+    def list(self, request):
+        token = self.get_token(request)
+        return self.cart_response(request, token, get_guest_items(token))
+
+    @action(detail=False, methods=['post'])
+    def add_item(self, request):
+        token = self.get_token(request) or new_guest_token()
+        serializer = GuestCartAddSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product_id = serializer.validated_data['product_id']
+        quantity = serializer.validated_data['quantity']
+        items = get_guest_items(token)
 
+        try:
+            product = Product.objects.only('id', 'stock').get(id=product_id, is_active=True)
+        except Product.DoesNotExist:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if product.id not in items and len(items) >= MAX_GUEST_CART_ITEMS:
+            return Response({'error': 'Cart is full'}, status=status.HTTP_400_BAD_REQUEST)
+
+        quantity += items.get(product.id, 0)
+        if quantity > product.stock:
+            return Response({'error': 'Insufficient stock'}, status=status.HTTP_400_BAD_REQUEST)
+
+        items[product.id] = quantity
+        save_guest_items(token, items)
+        return self.cart_response(request, token, items)
+
+    @action(detail=False, methods=['put'])
+    def update_item(self, request):
+        token = self.get_token(request)
+        serializer = GuestCartUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product_id = serializer.validated_data['product_id']
+        quantity = serializer.validated_data['quantity']
+        items = get_guest_items(token)
+
+        if product_id not in items:
+            return Response({'error': 'Item not found in cart'}, status=status.HTTP_404_NOT_FOUND)
+
+        if quantity == 0:
+            del items[product_id]
+        else:
+            stock = Product.objects.filter(id=product_id).values_list('stock', flat=True).first() or 0
+            if quantity > stock:
+                return Response({'error': 'Insufficient stock'}, status=status.HTTP_400_BAD_REQUEST)
+            items[product_id] = quantity
+
+        save_guest_items(token, items)
+        return self.cart_response(request, token, items)
+
+    @action(detail=False, methods=['delete'])
+    def remove_item(self, request):
+        token = self.get_token(request)
+        serializer = GuestCartProductSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        product_id = serializer.validated_data['product_id']
+        items = get_guest_items(token)
+
+        if product_id not in items:
+            return Response({'error': 'Item not found in cart'}, status=status.HTTP_404_NOT_FOUND)
+
+        del items[product_id]
+        save_guest_items(token, items)
+        return self.cart_response(request, token, items)
+
+    @action(detail=False, methods=['delete'])
+    def clear(self, request):
+        token = self.get_token(request)
+        if token:
+            save_guest_items(token, {})
+        return self.cart_response(request, token, {})
@@ -0,0 +1,23 @@
+"""
+Support for the benchmark management commands.
+"""
+from contextlib import contextmanager
+
+from django.db import connection, connections
+
+
+@contextmanager
+def throwaway_database(stdout):
+    """
+    Point the default connection at a fresh test_<NAME> database, as the test
+    runner does, and drop it on exit. Benchmark fixtures, and anything the
+    benchmark does to the schema, never reach the configured database.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    stdout.write(f'Benchmarking in throwaway database {test_name}')
+    try:
+        yield
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,141 @@
+"""
+Sparse fieldsets and expansion control for API responses.
+
+``?fields=id,name,items.product.name`` limits a response to the listed
+fields. A dotted path selects fields of a nested object, and naming a
+nested object on its own keeps all of its fields.
+
+``?expand=category,items.product`` lists the related objects to embed.
+When the parameter is present, every related object it does not name is
+rendered as its primary key. Without it, related objects are embedded as
+they always have been.
+
+Serializers opt in through SparseFieldsetMixin. Views read the same
+Fieldset to trim their querysets with ``only()`` and to skip joins and
+prefetches for objects that are not rendered.
+"""
+from rest_framework import serializers
+
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+
+def parse_paths(value):
+    """
+    Parse ``'a,b.c,b.d'`` into ``{'a': None, 'b': {'c': None, 'd': None}}``.
+    A value of None means the whole object.
+    """
+    tree = {}
+    for path in value.split(','):
+        parts = [part for part in path.strip().split('.') if part]
+        node = tree
+        for index, part in enumerate(parts):
+            if index == len(parts) - 1:
+                node[part] = None
+                break
+            child = node.get(part, {})
+            if child is None:
+                # The whole object was already requested
+                break
+            node[part] = child
+            node = child
+    return tree
+
+
+class Fieldset:
+    """
+    The fields and expansions requested for one object. ``fields`` and
+    ``expand`` are trees from parse_paths(), or None when the parameter was
+    not given.
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request):
+        if request is None:
+            return cls()
+        params = getattr(request, 'query_params', request.GET)
+        fields = params.get(FIELDS_QUERY_PARAM)
+        expand = params.get(EXPAND_QUERY_PARAM)
+        return cls(
+            parse_paths(fields) if fields else None,
+            parse_paths(expand) if expand is not None else None,
+        )
+
+    @property
+    def is_default(self):
+        return self.fields is None and self.expand is None
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.expand is None or name in self.expand
+
+    def renders(self, name):
+        """True if ``name`` is rendered as an embedded object."""
+        return self.includes(name) and self.expands(name)
+
+    def child(self, name):
+        fields = None if self.fields is None else self.fields.get(name)
+        expand = None if self.expand is None else (self.expand.get(name) or {})
+        return Fieldset(fields, expand)
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that drops the fields a request did not ask for.
+
+    ``expandable_fields`` names the related objects that are rendered as
+    their primary key unless expanded. ``field_sources`` maps computed
+    fields to the model columns they read, for required_columns().
+
+    A serializer takes its fieldset from the ``fieldset`` argument, from its
+    parent, or from the request in its context, in that order.
+    """
+    expandable_fields = ()
+    field_sources = {}
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        self._fieldset = fieldset
+        super().__init__(*args, **kwargs)
+
+    @property
+    def fieldset(self):
+        if self._fieldset is None:
+            self._fieldset = Fieldset.from_request(self.context.get('request'))
+        return self._fieldset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.fieldset
+        for name in list(fields):
+            if fields[name].write_only:
+                continue
+            if not fieldset.includes(name):
+                del fields[name]
+            elif name in self.expandable_fields and not fieldset.expands(name):
+                fields[name] = serializers.ReadOnlyField(source=f'{name}_id')
+            else:
+                nested = getattr(fields[name], 'child', fields[name])
+                if isinstance(nested, SparseFieldsetMixin):
+                    nested._fieldset = fieldset.child(name)
+        return fields
+
+    @classmethod
+    def required_columns(cls, fieldset):
+        """The model columns needed to render ``fieldset``, for ``only()``."""
+        opts = cls.Meta.model._meta
+        concrete = {field.name for field in opts.concrete_fields}
+        concrete.update(field.attname for field in opts.concrete_fields)
+        columns = [opts.pk.name]
+        for name in cls.Meta.fields:
+            if not fieldset.includes(name):
+                continue
+            for column in cls.field_sources.get(name, (name,)):
+                if column in concrete and column not in columns:
+                    columns.append(column)
+        return columns
@@ -0,0 +1,144 @@
+"""
+Pagination for the REST API.
+
+Page-number pagination stays the default. Clients that scroll through long
+listings can opt into keyset pagination with ``?pagination=cursor`` and then
+follow the returned ``next`` link. Keyset pages filter on the last row's sort
+key instead of using OFFSET, so deep pages cost the same as the first one,
+and no COUNT query is run.
+"""
+import base64
+import json
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination:
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def get_ordering(self, queryset):
+        """
+        Ordering already applied to the queryset (by OrderingFilter or the model
+        default), with ``id`` appended as a tiebreaker so every position is unique.
+        """
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        for term in ordering:
+            if not isinstance(term, str):
+                raise ValidationError('Cursor pagination is not supported for this ordering.')
+            name = term.lstrip('-')
+            if name in ('id', 'pk'):
+                continue
+            try:
+                field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ValidationError('Cursor pagination is not supported for this ordering.')
+            if field.is_relation or field.null:
+                raise ValidationError('Cursor pagination is not supported for this ordering.')
+        ordering = ['id' if term == 'pk' else '-id' if term == '-pk' else term for term in ordering]
+        if not {'id', '-id'} & set(ordering):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position = cursor['p']
+            if cursor['o'] != self.ordering or len(position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, instance):
+        # Pages may hold model instances or .values() rows
+        if isinstance(instance, dict):
+            position = [instance[term.lstrip('-')] for term in self.ordering]
+        else:
+            position = [getattr(instance, term.lstrip('-')) for term in self.ordering]
+        # Full-precision strings; DjangoJSONEncoder would cut datetimes to milliseconds
+        position = [value.isoformat() if hasattr(value, 'isoformat') else
+                    str(value) if isinstance(value, Decimal) else value
+                    for value in position]
+        cursor = json.dumps({'o': self.ordering, 'p': position})
+        return base64.urlsafe_b64encode(cursor.encode('ascii')).decode('ascii')
+
+    def get_keyset_filter(self, position):
+        # (a, b, id) > (x, y, z) expanded into ORs, honouring each column's direction
+        condition = Q()
+        for index, term in enumerate(self.ordering):
+            lookup = 'lt' if term.startswith('-') else 'gt'
+            step = Q(**{f'{term.lstrip("-")}__{lookup}': position[index]})
+            for previous_index, previous in enumerate(self.ordering[:index]):
+                step &= Q(**{previous.lstrip('-'): position[previous_index]})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+
+        # Fetch one extra row to learn whether another page exists
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class StorefrontPagination(PageNumberPagination):
+    """
+    PageNumberPagination that switches to KeysetPagination when the client
+    sends ``?pagination=cursor`` or follows a keyset ``cursor`` link.
+    """
+    mode_query_param = 'pagination'
+
+    def use_keyset(self, request):
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or KeysetPagination.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            page_size = self.get_page_size(request)
+            if not page_size:
+                return None
+            self.keyset = KeysetPagination(page_size)
+            self.display_page_controls = False
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,29 @@
+"""
+JSON parsing for the REST API.
+
+FastJSONParser decodes UTF-8 request bodies with orjson when it is
+installed, and uses DRF's JSONParser for anything else.
+"""
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            # orjson rejects NaN and Infinity, matching DRF's STRICT_JSON default
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,70 @@
+"""
+JSON rendering for the REST API.
+
+FastJSONRenderer encodes responses with orjson when it is installed and
+falls back to DRF's JSONRenderer otherwise. For finite numbers the bytes
+it produces are the same as DRF's: compact separators, raw UTF-8, escaped
+U+2028/U+2029, and Decimals, datetimes, lazy strings and the like
+formatted by DRF's own JSONEncoder. orjson formats floats below 1e-4 or
+from 1e16 up differently from Python's repr (``1e16`` for ``1e+16``,
+``0.00001`` for ``1e-05``), so output holding such a number is rendered
+again by DRF.
+
+NaN and infinity are the exception: orjson writes them as null, where
+DRF's renderer raises ValueError.
+"""
+import re
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+# datetime/date/time go through DRF's encoder (millisecond precision, 'Z' for UTC)
+# instead of orjson's native RFC 3339 output
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+# A number orjson wrote in exponent form or as 0.0000..., where repr() would differ.
+# A match inside a string only costs a fallback.
+REPR_MISMATCH_RE = re.compile(rb'(?:\A|[:,\[])-?(?:\d+(?:\.\d+)?[eE]|0\.0000)')
+
+
+class FastJSONRenderer(JSONRenderer):
+    def use_orjson(self, indent):
+        # orjson output only matches the default compact, non-ASCII-escaped format
+        return (
+            orjson is not None
+            and indent is None
+            and self.compact
+            and not self.ensure_ascii
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if self.use_orjson(indent):
+            try:
+                ret = orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+            except orjson.JSONEncodeError:
+                # e.g. integers beyond 64 bits; the stdlib encoder handles them
+                pass
+            else:
+                if not REPR_MISMATCH_RE.search(ret):
+                    return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+_renderer = FastJSONRenderer()
+
+
+def dumps(data):
+    """Encode ``data`` exactly as an API response body would be, as bytes."""
+    return _renderer.render(data)
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
     'products',
     'orders',
     'cart',
+    'storefront',
 ]
 
 MIDDLEWARE = [
@@ -85,6 +86,26 @@ if DATABASE_URL:
     except ImportError:
         pass
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='nextbloom'),
+    }
+}
+
+# Seconds a versioned catalog response stays cached; catalog writes invalidate it sooner
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a user's cart summary stays cached; cart writes invalidate it sooner
+CART_SUMMARY_CACHE_TIMEOUT = config('CART_SUMMARY_CACHE_TIMEOUT', default=60, cast=int)
+
+# Seconds an untouched guest cart is kept in the cache (use a shared cache backend in production)
+GUEST_CART_TIMEOUT = config('GUEST_CART_TIMEOUT', default=7 * 24 * 60 * 60, cast=int)
+
+# Seconds an unpaid Razorpay order holds its stock before release_expired_reservations returns it
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=15 * 60, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -129,7 +150,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': (
+        'nextbloom.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'nextbloom.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'nextbloom.pagination.StorefrontPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -138,6 +168,9 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Product search backend (dotted path); empty picks FTS5/PostgreSQL from the database
+PRODUCT_SEARCH_BACKEND = config('PRODUCT_SEARCH_BACKEND', default='')
+
 # JWT Settings
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -157,6 +190,10 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Guest carts send their signed token in this header
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = (*default_headers, 'x-cart-token')
+
 # Email Configuration (for production)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
@@ -0,0 +1,53 @@
+import datetime
+import math
+import random
+import uuid
+from decimal import Decimal
+
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONRendererParityTests(SimpleTestCase):
+    """FastJSONRenderer writes the same bytes as DRF's JSONRenderer."""
+
+    def assert_parity(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data), data)
+
+    def test_numbers(self):
+        values = [
+            0, -1, 2 ** 63, 2 ** 70, 0.0, -0.0, 0.1, 1e-4, 1.5e-4, 1e-5, 1.234e-7, 5e-324, 1e15, 1e16,
+            -1e16, 1.2345678901234568e17, 1e22, 1.5e300, 2.0 ** 53,
+            Decimal('0.00001'), Decimal('1E+20'), Decimal('19.99'), Decimal('-0.5'),
+        ]
+        for value in values:
+            self.assert_parity(value)
+            self.assert_parity({'value': value, 'list': [value, -value]})
+
+        rng = random.Random(12)
+        for _ in range(2000):
+            value = rng.uniform(1, 10) * 10 ** rng.randint(-12, 25) * rng.choice((1, -1))
+            self.assert_parity([value])
+
+    def test_other_values(self):
+        self.assert_parity({
+            'name': 'Ünïcödé \u2028 line \u2029 para "quoted" 1e5 0.00001',
+            'when': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2024, 5, 1),
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'lazy': gettext_lazy('Pending'),
+            'nested': [{'a': None, 'b': True}, [], {}],
+            1: 'integer key',
+        })
+
+    @skipUnless(orjson, 'orjson is not installed')
+    def test_non_finite_floats_are_written_as_null(self):
+        # The one documented difference: DRF refuses them
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'value': math.nan})
+        self.assertEqual(FastJSONRenderer().render({'value': math.nan, 'inf': -math.inf}),
+                         b'{"value":null,"inf":null}')
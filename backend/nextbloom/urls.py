@@ -15,6 +15,7 @@ urlpatterns = [
     path('api/products/', include('products.urls')),
     path('api/cart/', include('cart.urls')),
     path('api/orders/', include('orders.urls')),
+    path('api/storefront/', include('storefront.urls')),
 ]
 
 if settings.DEBUG:
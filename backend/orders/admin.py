@@ -2,8 +2,10 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
-from .models import Order, OrderItem
+from .models import DeliveryOutbox, Order, OrderItem
 from .delivery import get_delivery_status, cancel_delivery_order
+from .outbox import cancel_pending_shipment
+from .stock import UNSHIPPED_STATUSES, release_order_stock
 
 
 class OrderItemInline(admin.TabularInline):
@@ -50,6 +52,12 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and obj.status == 'cancelled' and form.initial.get('status') in UNSHIPPED_STATUSES:
+            release_order_stock(obj.pk)
+            cancel_pending_shipment(obj.pk)
+
     def get_readonly_fields(self, request, obj=None):
         readonly = list(self.readonly_fields)
         if obj:  # editing an existing object
@@ -60,6 +68,7 @@ class OrderAdmin(admin.ModelAdmin):
         colors = {
             'pending': 'gray',
             'processing': 'blue',
+            'on_hold': 'orange',
             'shipped': 'purple',
             'delivered': 'green',
             'cancelled': 'red'
@@ -115,8 +124,14 @@ class OrderAdmin(admin.ModelAdmin):
     mark_delivered.short_description = 'Mark selected orders as delivered'
     
     def mark_cancelled(self, request, queryset):
+        # Unshipped orders give their stock back; shipped goods are not back on the shelf
+        order_ids = list(queryset.filter(status__in=UNSHIPPED_STATUSES).values_list('id', flat=True))
         updated = queryset.update(status='cancelled')
-        self.message_user(request, f'{updated} orders marked as cancelled.')
+        released = sum(release_order_stock(order_id) for order_id in order_ids)
+        DeliveryOutbox.objects.filter(order_id__in=order_ids, status='pending').update(
+            status='cancelled', updated_at=timezone.now(),
+        )
+        self.message_user(request, f'{updated} orders marked as cancelled, stock returned for {released}.')
     mark_cancelled.short_description = 'Mark selected orders as cancelled'
     
     def refresh_delivery_status(self, request, queryset):
@@ -162,3 +177,20 @@ class OrderItemAdmin(admin.ModelAdmin):
         return obj.order.created_at
     created_at.short_description = 'Order Date'
 
+
+@admin.register(DeliveryOutbox)
+class DeliveryOutboxAdmin(admin.ModelAdmin):
+    list_display = ('order', 'status', 'attempts', 'next_attempt_at', 'last_error', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('order__order_number', 'last_error')
+    list_select_related = ('order',)
+    readonly_fields = ('order', 'payload', 'status', 'attempts', 'next_attempt_at', 'last_error', 'created_at', 'updated_at')
+    list_per_page = 25
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        updated = queryset.filter(status__in=('pending', 'dead')).update(
+            status='pending', attempts=0, next_attempt_at=timezone.now(), last_error='',
+        )
+        self.message_user(request, f'{updated} shipment requests queued for the next outbox run.')
+    retry_now.short_description = 'Retry selected shipment requests now'
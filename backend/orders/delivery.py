@@ -16,8 +16,8 @@ DELHIVERY_PICKUP_STATE = config('DELHIVERY_PICKUP_STATE', default='Maharashtra')
 DELHIVERY_PICKUP_PINCODE = config('DELHIVERY_PICKUP_PINCODE', default='400001')
 DELHIVERY_ENABLED = config('DELHIVERY_ENABLED', default=False, cast=bool)
 
-# Delhivery API Base URL
-DELHIVERY_API_BASE_URL = 'https://track.delhivery.com/api'
+# Delhivery API Base URL (overridable for staging or a local stub)
+DELHIVERY_API_BASE_URL = config('DELHIVERY_API_BASE_URL', default='https://track.delhivery.com/api')
 
 # Default package weight in grams (if not provided)
 DEFAULT_PACKAGE_WEIGHT = 500  # 500 grams = 0.5 kg
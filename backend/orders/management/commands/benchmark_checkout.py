@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from cart.models import Cart, CartItem
+from nextbloom.benchmarks import throwaway_database
+from orders.testing import CHECKOUT
+from products.models import Category, Product
+
+CART_SIZES = (1, 10, 50)
+
+
+class Command(BaseCommand):
+    help = ('Times COD checkout (POST /api/orders/) and counts its queries for carts of 1, 10 and '
+            '50 items, in a throwaway test database that is created and dropped around it.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with throwaway_database(self.stdout):
+            self.run(options['repeat'])
+
+    def run(self, repeat):
+        category = Category.objects.create(name='Checkout Benchmark', slug='checkout-benchmark')
+        products = [
+            Product.objects.create(
+                name=f'Checkout {i}', slug=f'checkout-benchmark-{i}', description='benchmark',
+                category=category, price=100 + i, discount_price=80 if i % 2 else None, stock=10_000,
+            )
+            for i in range(max(CART_SIZES))
+        ]
+        user = User.objects.create_user(username='checkout-benchmark', email='checkout-benchmark@example.com',
+                                        phone_number='+919000000000', password='checkout-benchmark')
+        cart, created = Cart.objects.get_or_create(user=user)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        self.stdout.write(f'{"items":>6} {"queries":>8} {"median ms":>10} {"max ms":>8}')
+        for size in CART_SIZES:
+            timings = []
+            for _ in range(repeat):
+                CartItem.objects.bulk_create(
+                    CartItem(cart=cart, product=product, quantity=2) for product in products[:size]
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = client.post('/api/orders/', CHECKOUT, format='json')
+                    timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 201:
+                    raise CommandError(f'Checkout returned {response.status_code}: {response.data}')
+                if len(response.data['items']) != size:
+                    raise CommandError(f'Order has {len(response.data["items"])} items, expected {size}')
+            self.stdout.write(f'{size:>6} {len(queries.captured_queries):>8} '
+                              f'{statistics.median(timings):>10.2f} {max(timings):>8.2f}')
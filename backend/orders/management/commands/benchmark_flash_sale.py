@@ -0,0 +1,63 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import User
+from cart.models import Cart, CartItem
+from nextbloom.benchmarks import throwaway_database
+from orders.testing import orders_placed, threaded_checkout
+from products.flash_sale import DEFAULT_SHARDS, end_flash_sale, reconcile_shards, start_flash_sale
+from products.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = ('Measures parallel COD checkout throughput for one hot product, first with its stock in '
+            'the single Product.stock row and then in flash-sale mode with sharded counters. The '
+            'checkouts must see each other\'s commits, so the benchmark runs in a throwaway test '
+            'database that is created and dropped around it; the configured database is never '
+            'written. Use PostgreSQL, since SQLite serialises all writers and shows no difference.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=32)
+        parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS)
+
+    def handle(self, *args, **options):
+        with throwaway_database(self.stdout):
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        stock = options['buyers'] * 2
+        category = Category.objects.create(name='Flash Sale Benchmark', slug='flash-sale-benchmark')
+        product = Product.objects.create(name='Flash sale benchmark', slug='flash-sale-benchmark',
+                                         description='benchmark', category=category, price=100, stock=stock)
+        users = [
+            User.objects.create_user(username=f'flash-sale-{i}', email=f'flash-sale-{i}@example.com',
+                                     phone_number=f'+91700000{i:04d}', password='flash-sale')
+            for i in range(options['buyers'])
+        ]
+        carts = [Cart.objects.get_or_create(user=user)[0] for user in users]
+
+        self.stdout.write(f'{"mode":<22} {"placed":>7} {"errors":>7} {"seconds":>8} {"orders/s":>9}')
+        self.run('single row', product, users, carts, options['workers'])
+        start_flash_sale([product.id], options['shards'])
+        self.run(f'{options["shards"]} shards', product, users, carts, options['workers'])
+        reconcile_shards([product.id])
+        end_flash_sale([product.id])
+
+        sold = orders_placed()
+        product.refresh_from_db(fields=['stock'])
+        if product.stock != stock - sold:
+            raise CommandError(f'Stock is {product.stock}, expected {stock - sold} after {sold} orders')
+        self.stdout.write(self.style.SUCCESS(f'Stock accounted for: {sold} sold, {product.stock} left'))
+
+    def run(self, mode, product, users, carts, workers):
+        # Carts whose checkout failed last round still hold their item
+        CartItem.objects.filter(cart__in=carts).delete()
+        CartItem.objects.bulk_create(CartItem(cart=cart, product=product, quantity=1) for cart in carts)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(threaded_checkout, users))
+        elapsed = time.perf_counter() - started
+        placed = results.count(201)
+        self.stdout.write(f'{mode:<22} {placed:>7} {len(results) - placed:>7} {elapsed:>8.2f} {placed / elapsed:>9.1f}')
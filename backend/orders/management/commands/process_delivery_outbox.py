@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from orders.outbox import MAX_ATTEMPTS, drain
+
+
+class Command(BaseCommand):
+    help = ('Sends pending Delhivery shipment requests from the delivery outbox, retrying failures '
+            'with exponential backoff and dead-lettering them after --max-attempts. Run it from cron, '
+            'or keep it running with --loop. Several workers can run at once.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when drained')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            counts = drain(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+            if any(counts.values()) or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{counts["sent"]} sent, {counts["retried"]} to retry, {counts["dead"]} dead-lettered'
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
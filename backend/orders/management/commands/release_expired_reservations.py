@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from orders.stock import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = ('Returns the stock held by unpaid Razorpay orders whose reservations have expired. '
+            'Run it every minute or so from cron or a scheduler.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Orders released per transaction')
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released stock for {released} expired orders'))
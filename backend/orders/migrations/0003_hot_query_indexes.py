@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_delivery_partner_order_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ),
+    ]
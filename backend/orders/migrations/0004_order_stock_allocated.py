@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='stock_allocated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_hot_query_indexes'),
+        ('orders', '0004_order_stock_allocated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='orders.order')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'expires_at'], name='reservation_product_exp_idx'), models.Index(fields=['expires_at'], name='reservation_expires_idx')],
+            },
+        ),
+    ]
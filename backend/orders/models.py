@@ -7,6 +7,8 @@ class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('processing', 'Processing'),
+        # Paid, but its stock could not be allocated; needs a refund or a restock by hand
+        ('on_hold', 'On Hold'),
         ('shipped', 'Shipped'),
         ('delivered', 'Delivered'),
         ('cancelled', 'Cancelled'),
@@ -44,19 +46,28 @@ class Order(models.Model):
     delivery_tracking_id = models.CharField(max_length=100, blank=True, null=True)
     delivery_status = models.CharField(max_length=50, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
+    # True while the order's quantities are taken off Product.stock (see orders.stock)
+    stock_allocated = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number}"
 
+    @staticmethod
+    def generate_order_number():
+        import uuid
+        return f"ORD-{uuid.uuid4().hex[:10].upper()}"
+
     def save(self, *args, **kwargs):
         if not self.order_number:
-            import uuid
-            self.order_number = f"ORD-{uuid.uuid4().hex[:10].upper()}"
+            self.order_number = self.generate_order_number()
         super().save(*args, **kwargs)
 
 
@@ -74,3 +85,61 @@ class OrderItem(models.Model):
         self.total = self.price * self.quantity
         super().save(*args, **kwargs)
 
+
+class StockReservation(models.Model):
+    """
+    Stock held for an unpaid prepaid order until ``expires_at``. The quantity
+    is already taken off Product.stock; the row records that it is only held,
+    so the sweeper can give it back if the payment never arrives.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    # Covered by reservation_product_exp_idx, so no separate index to maintain on insert
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations', db_index=False)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Live reservations per product, summed by the ProductAdmin reserved_stock column
+            models.Index(fields=['product', 'expires_at'], name='reservation_product_exp_idx'),
+            # Expired reservations, for the sweeper
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for order {self.order_id}"
+
+
+class DeliveryOutbox(models.Model):
+    """
+    A Delhivery shipment request written in the same transaction as a COD
+    Order, or as a prepaid order's payment, and sent later by
+    process_delivery_outbox. See orders.outbox.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='delivery_outbox')
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'delivery outbox'
+        indexes = [
+            # Due entries, for the worker; sent and dead rows stay out of the index
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='pending'),
+                         name='delivery_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Shipment for order {self.order_id} ({self.status})"
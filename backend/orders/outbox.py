@@ -0,0 +1,144 @@
+"""
+Transactional outbox for Delhivery shipments.
+
+Checkout does not call Delhivery. A COD order's DeliveryOutbox row is
+written in the same transaction as the Order, so checkout latency does not
+depend on Delhivery. A Razorpay order gets its row only once verify_payment
+accepts the payment; until then nothing can ship stock that an expired
+reservation or a failed payment may hand back to inventory.
+
+``manage.py process_delivery_outbox`` drains the table. Each batch claims
+due rows with SKIP LOCKED and pushes their next_attempt_at forward by
+LEASE_SECONDS before sending. Several workers can run side by side, and a
+row claimed by a worker that dies becomes due again after the lease. No
+transaction is held open across the 30-second HTTP call.
+
+A successful request copies the waybill into the order's delivery fields.
+A failed one is retried after an exponential backoff. After
+``max_attempts`` failures the row is dead-lettered: it is marked ``dead``
+and the order is left as 'Pending Manual Entry', as before. Dead rows can
+be retried from the admin. Cancelling an order cancels its pending row,
+and a shipment created while the cancellation raced it is cancelled
+straight away.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from . import delivery
+from .models import DeliveryOutbox, Order
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+# Longer than the Delhivery request timeout, so a live worker never loses its claim
+LEASE_SECONDS = 120
+
+
+def shipment_payload(order, items):
+    """The Delhivery shipment request for ``order``; ``items`` are its OrderItems with their products."""
+    user = order.user
+    return {
+        'order_id': order.order_number,
+        'delivery_address': order.shipping_address,
+        'delivery_city': order.shipping_city,
+        'delivery_state': order.shipping_state,
+        'delivery_pincode': order.shipping_zip_code,
+        'customer_name': f"{user.first_name or ''} {user.last_name or ''}".strip() or user.email,
+        'customer_phone': order.shipping_phone,
+        'items': [
+            {'name': item.product.name, 'quantity': item.quantity, 'price': float(item.price)} for item in items
+        ],
+        'total_amount': float(order.total),
+        'payment_method': order.payment_method,
+    }
+
+
+def enqueue_shipment(order, payload):
+    return DeliveryOutbox.objects.create(order=order, payload=payload)
+
+
+def backoff(attempts):
+    """Seconds to wait after the ``attempts``-th failure: 30s, 60s, 120s, ... capped at an hour."""
+    return min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+
+
+def claim_due(batch_size, now):
+    """Lease up to ``batch_size`` due rows to this worker and return them."""
+    with transaction.atomic():
+        ids = list(
+            DeliveryOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at').values_list('id', flat=True)[:batch_size]
+        )
+        DeliveryOutbox.objects.filter(id__in=ids).update(
+            attempts=F('attempts') + 1, next_attempt_at=now + timedelta(seconds=LEASE_SECONDS),
+        )
+    return list(DeliveryOutbox.objects.filter(id__in=ids).order_by('id'))
+
+
+def send(entry, max_attempts, now):
+    """Send one claimed row and record the outcome. Returns 'sent', 'retried' or 'dead'."""
+    result = delivery.create_delivery_order(entry.payload)
+    if result.get('success'):
+        with transaction.atomic():
+            Order.objects.filter(pk=entry.order_id).update(
+                delivery_partner_order_id=result.get('order_id'),
+                delivery_tracking_id=result.get('tracking_id'),
+                delivery_status=result.get('status', 'Pending'),
+                updated_at=now,
+            )
+            still_wanted = DeliveryOutbox.objects.filter(pk=entry.pk, status='pending').update(
+                status='sent', last_error='', updated_at=now,
+            )
+        if not still_wanted and result.get('tracking_id'):
+            # The order was cancelled while the request was in flight
+            delivery.cancel_delivery_order(result['tracking_id'])
+        return 'sent'
+
+    error = result.get('message') or 'Unknown error'
+    # Retrying cannot help while the integration is switched off
+    disabled = not delivery.DELHIVERY_ENABLED or not delivery.DELHIVERY_API_TOKEN
+    if disabled or entry.attempts >= max_attempts:
+        with transaction.atomic():
+            DeliveryOutbox.objects.filter(pk=entry.pk, status='pending').update(
+                status='dead', last_error=error, updated_at=now,
+            )
+            Order.objects.filter(pk=entry.order_id).update(delivery_status='Pending Manual Entry', updated_at=now)
+        print(f"Delhivery shipment for order {entry.order_id} dead-lettered after {entry.attempts} attempts: {error}")
+        return 'dead'
+
+    DeliveryOutbox.objects.filter(pk=entry.pk, status='pending').update(
+        next_attempt_at=now + timedelta(seconds=backoff(entry.attempts)), last_error=error, updated_at=now,
+    )
+    return 'retried'
+
+
+def drain(batch_size=50, max_attempts=MAX_ATTEMPTS, now=None):
+    """Send every due row, a batch at a time. Returns counts per outcome."""
+    counts = {'sent': 0, 'retried': 0, 'dead': 0}
+    while True:
+        batch_now = now or timezone.now()
+        entries = claim_due(batch_size, batch_now)
+        if not entries:
+            return counts
+        for entry in entries:
+            counts[send(entry, max_attempts, batch_now)] += 1
+
+
+def has_shipment(order_id):
+    """True if the order has a shipment request that is queued, sent or dead-lettered."""
+    return DeliveryOutbox.objects.filter(order_id=order_id).exclude(status='cancelled').exists()
+
+
+def cancel_pending_shipment(order_id):
+    """Drop an order's unsent shipment request. Returns True if one was pending."""
+    return bool(cancel_pending_shipments([order_id]))
+
+
+def cancel_pending_shipments(order_ids):
+    """Drop the unsent shipment requests of ``order_ids``. Returns how many were pending."""
+    return DeliveryOutbox.objects.filter(order_id__in=order_ids, status='pending').update(
+        status='cancelled', updated_at=timezone.now(),
+    )
@@ -1,10 +1,31 @@
+import logging
+
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import transaction
+from django.utils import timezone
 from .models import Order
+from .outbox import cancel_pending_shipment, enqueue_shipment, has_shipment, shipment_payload
 from .payment import verify_razorpay_payment
+from .stock import InsufficientStock, commit_order_reservations, reallocate_order_stock, release_order_stock
 from cart.models import Cart
+from cart.summary import invalidate_cart_summary
+
+logger = logging.getLogger(__name__)
+
+HOLD_MESSAGE = 'Payment received, but some items are out of stock. The order is on hold and our team will contact you.'
+
+
+def hold_response(order):
+    return Response({
+        'success': False,
+        'error': HOLD_MESSAGE,
+        'order_id': order.id,
+        'order_number': order.order_number,
+        'status': order.status,
+    }, status=status.HTTP_409_CONFLICT)
 
 
 @api_view(['POST'])
@@ -36,17 +57,39 @@ def verify_payment(request):
     )
 
     if is_valid:
-        # Update order payment status
+        if order.status == 'on_hold':
+            # Already paid and waiting for review; a repeated callback must not ship it
+            return hold_response(order)
+
+        # Held stock becomes sold stock; committing first keeps the expiry sweeper off this order
+        commit_order_reservations(order.id)
         order.payment_status = 'paid'
         order.razorpay_payment_id = razorpay_payment_id
         order.razorpay_signature = razorpay_signature
+        # A payment that succeeds after its stock was released needs the stock back
+        try:
+            reallocate_order_stock(order.id)
+        except InsufficientStock as exc:
+            logger.error('Order %s was paid after its stock was released and products %s are out of stock; '
+                         'order put on hold for a refund or restock', order.order_number, exc.product_ids)
+            order.status = 'on_hold'
+            order.save()
+            return hold_response(order)
+        order.stock_allocated = True
         order.status = 'processing'
-        order.save()
+        with transaction.atomic():
+            # The row lock keeps a repeated callback from queueing a second shipment
+            Order.objects.select_for_update().only('id').get(pk=order.pk)
+            order.save()
+            # Prepaid orders ship only once paid and holding their stock
+            if not has_shipment(order.id):
+                enqueue_shipment(order, shipment_payload(order, order.items.select_related('product')))
 
         # Clear cart
         try:
             cart = Cart.objects.get(user=request.user)
             cart.items.all().delete()
+            invalidate_cart_summary(request.user.pk)
         except Cart.DoesNotExist:
             pass
 
@@ -57,8 +100,14 @@ def verify_payment(request):
             'order_number': order.order_number
         })
     else:
-        order.payment_status = 'failed'
-        order.save()
+        # A bad signature must not undo a payment that already went through
+        failed = Order.objects.filter(pk=order.pk).exclude(payment_status='paid').update(
+            payment_status='failed', updated_at=timezone.now(),
+        )
+        if failed:
+            # Return the stock held for the unpaid order; a shipment queued before payment must not go out
+            release_order_stock(order.id)
+            cancel_pending_shipment(order.id)
         return Response({
             'success': False,
             'error': 'Payment verification failed'
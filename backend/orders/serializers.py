@@ -1,17 +1,20 @@
 from rest_framework import serializers
+from nextbloom.fieldsets import SparseFieldsetMixin
 from products.serializers import ProductListSerializer
 from .models import Order, OrderItem
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductListSerializer(read_only=True)
 
     class Meta:
         model = OrderItem
         fields = ('id', 'product', 'quantity', 'price', 'total')
 
+    expandable_fields = ('product',)
 
-class OrderSerializer(serializers.ModelSerializer):
+
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user = serializers.StringRelatedField(read_only=True)
 
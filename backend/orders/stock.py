@@ -0,0 +1,212 @@
+"""
+Stock allocation for orders.
+
+Placing an order takes its quantities off Product.stock with a single
+conditional UPDATE:
+
+    UPDATE product SET stock = stock - CASE id WHEN ... END
+    WHERE id IN (...) AND stock >= CASE id WHEN ... END
+
+Each row is checked and decremented atomically by the database, so two
+checkouts racing for the last units cannot both succeed. If fewer rows
+match than there are products in the order, at least one line is short
+and the update is rolled back to a savepoint before InsufficientStock is
+raised, so an order gets all of its lines or none of them.
+
+Cancelling an order or failing its payment gives the stock back through
+release_order_stock(). Order.stock_allocated records whether an order still
+holds stock. It is flipped by a conditional update in the same transaction
+that moves the stock, so repeated cancellations or payment callbacks
+release it only once.
+
+An unpaid Razorpay order holds its stock through StockReservation rows
+that expire after STOCK_RESERVATION_TTL seconds. Product.stock is already
+net of them, so availability checks stay a single column read; the rows
+only record what is held. The product admin sums the live ones through
+the (product, expires_at) index. verify_payment commits the
+reservation by deleting it, and release_expired_reservations() returns the
+stock of orders whose payment never arrived, a batch of orders at a time,
+locking only those order rows and cancelling any shipment still queued
+for them.
+
+Flash-sale products keep their stock in StockShard rows instead (see
+products.flash_sale); their lines are allocated and released one shard
+update each, still inside the same savepoint.
+
+Stock is rendered in catalog responses, so every change to Product.stock
+also sets updated_at, which moves the ETag/Last-Modified validators, and
+bumps the catalog version once the transaction commits. Shard updates
+leave Product alone; their totals reach the catalog when the shards are
+reconciled.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Now
+from django.utils import timezone
+from products.cache import bump_catalog_version
+from products.flash_sale import return_to_shards, take_from_shards
+from products.models import Product
+from .models import Order, OrderItem, StockReservation
+from .outbox import cancel_pending_shipments
+
+# Orders in these states can be cancelled with their stock returned
+UNSHIPPED_STATUSES = ('pending', 'processing')
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f'Insufficient stock for products {product_ids}')
+
+
+def _per_product(quantities):
+    return Case(
+        *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def allocate_stock(quantities):
+    """
+    Take ``{product_id: quantity}`` off Product.stock in one UPDATE, or raise
+    InsufficientStock naming the short products and leave stock untouched.
+    Flash-sale products are taken from their shards instead.
+    """
+    if not quantities:
+        return
+    amount = _per_product(quantities)
+    sharded = []
+    short = []
+    with transaction.atomic():
+        allocated = Product.objects.filter(id__in=quantities, is_active=True, stock_shards=0, stock__gte=amount).update(
+            stock=F('stock') - amount, updated_at=Now(),
+        )
+        if allocated != len(quantities):
+            # Only flash-sale products and short lines get here, so ordinary checkouts skip this query
+            sharded = list(
+                Product.objects.filter(id__in=quantities, is_active=True, stock_shards__gt=0)
+                .values_list('id', flat=True)
+            )
+            short = [product_id for product_id in sharded if not take_from_shards(product_id, quantities[product_id])]
+            allocated += len(sharded) - len(short)
+        if allocated != len(quantities):
+            # Undo the lines that did fit
+            transaction.set_rollback(True)
+    if allocated != len(quantities):
+        stock = dict(
+            Product.objects.filter(id__in=quantities, is_active=True, stock_shards=0).values_list('id', 'stock')
+        )
+        raise InsufficientStock(sorted(short + [
+            product_id for product_id, quantity in quantities.items()
+            if product_id not in sharded and stock.get(product_id, 0) < quantity
+        ]))
+    if len(sharded) != len(quantities):
+        # At least one line changed Product.stock
+        transaction.on_commit(bump_catalog_version)
+
+
+def release_stock(quantities):
+    """Put ``{product_id: quantity}`` back on Product.stock in one UPDATE, or on a shard for flash-sale products."""
+    if not quantities:
+        return
+    released = Product.objects.filter(id__in=quantities, stock_shards=0).update(
+        stock=F('stock') + _per_product(quantities), updated_at=Now(),
+    )
+    if released:
+        transaction.on_commit(bump_catalog_version)
+    if released != len(quantities):
+        for product_id in Product.objects.filter(id__in=quantities, stock_shards__gt=0).values_list('id', flat=True):
+            return_to_shards(product_id, quantities[product_id])
+
+
+def order_quantities(order_id):
+    return dict(
+        OrderItem.objects.filter(order_id=order_id)
+        .values('product_id').annotate(quantity=Sum('quantity'))
+        .values_list('product_id', 'quantity')
+    )
+
+
+def release_order_stock(order_id):
+    """
+    Return the stock held by an order. Returns False without touching stock
+    if the order never allocated any or has already released it.
+    """
+    with transaction.atomic():
+        StockReservation.objects.filter(order_id=order_id).delete()
+        if not Order.objects.filter(pk=order_id, stock_allocated=True).update(stock_allocated=False):
+            return False
+        release_stock(order_quantities(order_id))
+    return True
+
+
+def reallocate_order_stock(order_id):
+    """
+    Take an order's stock again after it was released, e.g. when a payment
+    succeeds on retry. Raises InsufficientStock if it is no longer available.
+    Returns False if the order still holds its stock.
+    """
+    with transaction.atomic():
+        if not Order.objects.filter(pk=order_id, stock_allocated=False).update(stock_allocated=True):
+            return False
+        allocate_stock(order_quantities(order_id))
+    return True
+
+
+def reserve_order_stock(order, quantities):
+    """Hold an allocated order's ``{product_id: quantity}`` for STOCK_RESERVATION_TTL seconds."""
+    expires_at = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+    StockReservation.objects.bulk_create(
+        StockReservation(order=order, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in quantities.items()
+    )
+
+
+def commit_order_reservations(order_id):
+    """Turn an order's held stock into sold stock once it is paid."""
+    StockReservation.objects.filter(order_id=order_id).delete()
+
+
+def release_expired_reservations(batch_size=500, now=None):
+    """
+    Return the stock of orders whose reservations have expired, ``batch_size``
+    orders per transaction. Each batch locks only its own order rows, skipping
+    any held by a concurrent payment verification, and moves stock back with
+    one UPDATE. Returns the number of orders released.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        order_ids = list(
+            StockReservation.objects.filter(expires_at__lte=now)
+            .order_by().values_list('order_id', flat=True).distinct()[:batch_size]
+        )
+        if not order_ids:
+            break
+        with transaction.atomic():
+            locked = list(
+                Order.objects.select_for_update(skip_locked=True)
+                .filter(pk__in=order_ids).values_list('pk', 'stock_allocated')
+            )
+            if not locked:
+                break
+            # Read under the order locks: a payment that committed its reservation first is left alone
+            held = list(
+                StockReservation.objects.filter(
+                    order_id__in=[order_id for order_id, stock_allocated in locked if stock_allocated],
+                ).values_list('order_id', 'product_id', 'quantity')
+            )
+            quantities = {}
+            for order_id, product_id, quantity in held:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            expired = {order_id for order_id, product_id, quantity in held}
+            release_stock(quantities)
+            Order.objects.filter(pk__in=expired).update(stock_allocated=False)
+            # Unpaid orders must not ship the stock just returned
+            cancel_pending_shipments(expired)
+            StockReservation.objects.filter(order_id__in=[order_id for order_id, _ in locked]).delete()
+        released += len(expired)
+    return released
@@ -0,0 +1,32 @@
+"""
+Checkout helpers shared by the orders tests and the checkout benchmarks.
+"""
+from django.db import connections
+from rest_framework.test import APIClient
+from .models import Order
+
+CHECKOUT = {
+    'shipping_address': '1 Test Road', 'shipping_city': 'Mumbai', 'shipping_state': 'Maharashtra',
+    'shipping_zip_code': '400001', 'shipping_phone': '+919000000000', 'payment_method': 'cod',
+}
+
+
+def threaded_checkout(user):
+    """Place a COD order for ``user``'s cart from a worker thread; returns the status code or exception name."""
+    client = APIClient()
+    client.force_authenticate(user)
+    try:
+        return client.post('/api/orders/', CHECKOUT, format='json').status_code
+    except Exception as exc:
+        return type(exc).__name__
+    finally:
+        # Each worker thread has its own connection
+        connections.close_all()
+
+
+def orders_placed():
+    """
+    Orders committed so far. A checkout can commit and still fail on a lock
+    while rendering its response, so count orders rather than 201 responses.
+    """
+    return Order.objects.count()
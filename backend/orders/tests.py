@@ -0,0 +1,330 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from cart.models import Cart, CartItem
+from products.flash_sale import end_flash_sale, reconcile_shards, start_flash_sale
+from products.models import Category, Product, StockShard
+from . import delivery
+from .models import DeliveryOutbox, Order
+from .outbox import backoff, drain, enqueue_shipment
+from .stock import release_expired_reservations
+from .testing import CHECKOUT, orders_placed, threaded_checkout
+
+
+def create_buyer(index, product, quantity=1):
+    user = User.objects.create_user(username=f'buyer-{index}', email=f'buyer-{index}@example.com',
+                                    phone_number=f'+91800000{index:04d}', password='buyer')
+    cart, created = Cart.objects.get_or_create(user=user)
+    CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+    return user
+
+
+class VerifyPaymentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Payments', slug='payments')
+        cls.product = Product.objects.create(name='Payment product', slug='payment-product',
+                                             description='payments', category=category, price=100, stock=5)
+        cls.user = create_buyer(1, cls.product, quantity=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with mock.patch('orders.views.create_razorpay_order', return_value={'id': 'order_test'}):
+            response = self.client.post('/api/orders/', {**CHECKOUT, 'payment_method': 'razorpay'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.order_id = response.data['id']
+
+    def verify(self, valid):
+        with mock.patch('orders.razorpay_views.verify_razorpay_payment', return_value=valid):
+            return self.client.post('/api/orders/payment/verify/', {
+                'order_id': self.order_id, 'razorpay_order_id': 'order_test',
+                'razorpay_payment_id': 'pay_test', 'razorpay_signature': 'signature',
+            }, format='json')
+
+    def stock(self):
+        return Product.objects.get(pk=self.product.pk).stock
+
+    def test_failed_payment_returns_stock_once(self):
+        self.assertEqual(self.stock(), 3)
+        self.assertEqual(self.verify(False).status_code, 400)
+        self.assertEqual(self.verify(False).status_code, 400)
+        self.assertEqual(self.stock(), 5)
+        self.assertEqual(Order.objects.get(pk=self.order_id).payment_status, 'failed')
+
+    def test_bad_signature_after_payment_keeps_order_paid(self):
+        self.assertEqual(self.verify(True).status_code, 200)
+        self.assertEqual(self.verify(False).status_code, 400)
+        order = Order.objects.get(pk=self.order_id)
+        self.assertEqual((order.payment_status, order.status, order.stock_allocated), ('paid', 'processing', True))
+        self.assertEqual(self.stock(), 3)
+
+    def shipments(self):
+        return list(DeliveryOutbox.objects.filter(order_id=self.order_id).values_list('status', flat=True))
+
+    def test_prepaid_order_is_queued_for_shipping_once_paid(self):
+        self.assertEqual(self.shipments(), [])
+        self.assertEqual(self.verify(True).status_code, 200)
+        self.assertEqual(self.verify(True).status_code, 200)
+        self.assertEqual(self.shipments(), ['pending'])
+        self.assertEqual(DeliveryOutbox.objects.get(order_id=self.order_id).payload['payment_method'], 'razorpay')
+
+    def test_failed_payment_cancels_queued_shipment(self):
+        # As queued at checkout before prepaid orders waited for their payment
+        enqueue_shipment(Order.objects.get(pk=self.order_id), {})
+        self.assertEqual(self.verify(False).status_code, 400)
+        self.assertEqual(self.shipments(), ['cancelled'])
+        self.assertEqual(self.stock(), 5)
+
+    def test_expired_reservation_cancels_queued_shipment(self):
+        enqueue_shipment(Order.objects.get(pk=self.order_id), {})
+        self.assertEqual(release_expired_reservations(now=timezone.now() + timedelta(days=1)), 1)
+        self.assertEqual(self.shipments(), ['cancelled'])
+        self.assertEqual(self.stock(), 5)
+
+        # A late payment takes the stock again and queues a fresh shipment
+        self.assertEqual(self.verify(True).status_code, 200)
+        self.assertEqual(sorted(self.shipments()), ['cancelled', 'pending'])
+        self.assertEqual(self.stock(), 3)
+
+
+    def test_late_payment_without_stock_puts_order_on_hold(self):
+        release_expired_reservations(now=timezone.now() + timedelta(days=1))
+        # Someone else bought the released stock
+        Product.objects.filter(pk=self.product.pk).update(stock=0)
+
+        with self.assertLogs('orders.razorpay_views', 'ERROR'):
+            response = self.verify(True)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['status'], 'on_hold')
+        order = Order.objects.get(pk=self.order_id)
+        self.assertEqual((order.payment_status, order.status, order.stock_allocated), ('paid', 'on_hold', False))
+        self.assertEqual(self.shipments(), [])
+        self.assertEqual(self.stock(), 0)
+
+        # A repeated callback leaves the held order alone, even once stock is back
+        Product.objects.filter(pk=self.product.pk).update(stock=5)
+        self.assertEqual(self.verify(True).status_code, 409)
+        self.assertEqual(Order.objects.get(pk=self.order_id).status, 'on_hold')
+        self.assertEqual(self.stock(), 5)
+
+
+class CheckoutTests(TestCase):
+    def test_deactivated_product_is_reported_as_unavailable(self):
+        category = Category.objects.create(name='Checkout', slug='checkout')
+        product = Product.objects.create(name='Retired product', slug='retired-product', description='checkout',
+                                         category=category, price=100, stock=5)
+        client = APIClient()
+        client.force_authenticate(create_buyer(1, product))
+        Product.objects.filter(pk=product.pk).update(is_active=False)
+
+        response = client.post('/api/orders/', CHECKOUT, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Product unavailable', 'product_ids': [product.id]})
+        self.assertEqual(Product.objects.get(pk=product.pk).stock, 5)
+        self.assertFalse(Order.objects.exists())
+
+
+class StockCatalogFreshnessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Freshness', slug='freshness')
+        cls.product = Product.objects.create(name='Freshness product', slug='freshness-product',
+                                             description='freshness', category=category, price=100, stock=5)
+
+    def setUp(self):
+        cache.clear()
+        self.url = f'/api/products/{self.product.slug}/'
+
+    def checkout(self, index, quantity):
+        client = APIClient()
+        client.force_authenticate(create_buyer(index, self.product, quantity))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/orders/', CHECKOUT, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_checkout_refreshes_product_validators_and_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['stock'], 5)
+
+        self.checkout(1, 5)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock'], 0)
+
+    def test_cancellation_refreshes_product_validators_and_cache(self):
+        order_id = self.checkout(1, 2).data['id']
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['stock'], 3)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='buyer-1'))
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(f'/api/orders/{order_id}/cancel/')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock'], 5)
+
+
+class FlashSaleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Flash Sale', slug='flash-sale')
+        cls.product = Product.objects.create(name='Flash sale product', slug='flash-sale-product',
+                                             description='flash sale', category=category, price=100, stock=20)
+
+    def setUp(self):
+        cache.clear()
+        self.url = f'/api/products/{self.product.slug}/'
+        start_flash_sale([self.product.id], shards=4)
+
+    def test_orders_take_from_shards_and_reconcile_refreshes_catalog(self):
+        response = self.client.get(self.url)
+        for index in range(3):
+            client = APIClient()
+            client.force_authenticate(create_buyer(index, self.product, quantity=2))
+            self.assertEqual(client.post('/api/orders/', CHECKOUT, format='json').status_code, 201)
+        self.assertEqual(sum(StockShard.objects.values_list('stock', flat=True)), 14)
+        # Orders leave the product row alone until the shards are reconciled
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reconcile_shards(), 1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock'], 14)
+        # Nothing moved, so nothing is touched
+        self.assertEqual(reconcile_shards(), 0)
+
+    def test_end_flash_sale_refreshes_catalog(self):
+        StockShard.objects.filter(product=self.product, shard=0).update(stock=0)
+        response = self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            end_flash_sale([self.product.id])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock'], 15)
+        self.assertFalse(StockShard.objects.exists())
+
+
+class OversellTests(TransactionTestCase):
+    """Parallel checkouts never sell more units than were in stock.
+
+    The checkouts run in worker threads that must see each other's commits,
+    hence TransactionTestCase. SQLite serialises writers, so some of them may
+    fail with lock errors there; PostgreSQL exercises the real race.
+    """
+
+    def test_parallel_checkouts_do_not_oversell(self):
+        category = Category.objects.create(name='Oversell', slug='oversell')
+        product = Product.objects.create(name='Oversell product', slug='oversell-product',
+                                         description='oversell', category=category, price=100, stock=5)
+        users = [create_buyer(index, product) for index in range(20)]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(threaded_checkout, users))
+        sold = orders_placed()
+        product.refresh_from_db(fields=['stock'])
+        self.assertGreaterEqual(sold, results.count(201), results)
+        self.assertLessEqual(sold, 5, results)
+        self.assertEqual(product.stock, 5 - sold, results)
+
+
+class StubDelhivery(BaseHTTPRequestHandler):
+    """Answers shipment requests with the next queued status code; 200 creates a waybill."""
+    statuses = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        code = self.statuses.pop(0) if self.statuses else 200
+        body = {'packages': [{'waybill': 'STUB-WAYBILL'}]} if code == 200 else {'error': {'message': 'stub failure'}}
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DeliveryOutboxTests(TestCase):
+    """The outbox worker retries, backs off, dead-letters and updates orders against a stub Delhivery."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubDelhivery)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='outbox-check', email='outbox-check@example.com',
+                                            phone_number='+919100000000', password='outbox-check')
+
+    def setUp(self):
+        for name, value in (('DELHIVERY_ENABLED', True), ('DELHIVERY_API_TOKEN', 'stub-token'),
+                            ('DELHIVERY_API_BASE_URL', f'http://127.0.0.1:{self.server.server_port}')):
+            patcher = mock.patch.object(delivery, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_order(self, number, statuses):
+        StubDelhivery.statuses = statuses
+        order = Order.objects.create(
+            user=self.user, order_number=f'OUTBOX-{number}', subtotal=100, total=150, shipping_address='1 Stub Road',
+            shipping_city='Mumbai', shipping_state='Maharashtra', shipping_zip_code='400001',
+            shipping_phone='+919100000000', delivery_status='Pending',
+        )
+        enqueue_shipment(order, {'order_id': order.order_number, 'items': [], 'payment_method': 'cod'})
+        return order
+
+    def test_retries_with_backoff_then_sends(self):
+        order = self.make_order(1, [500, 503])
+        now = timezone.now()
+
+        self.assertEqual(drain(now=now)['retried'], 1)
+        entry = DeliveryOutbox.objects.get(order=order)
+        self.assertEqual(entry.next_attempt_at, now + timedelta(seconds=backoff(1)))
+        # Not due again until the backoff has elapsed
+        self.assertEqual(drain(now=now)['retried'], 0)
+
+        now += timedelta(seconds=backoff(1))
+        drain(now=now)
+        entry.refresh_from_db()
+        self.assertEqual(entry.next_attempt_at, now + timedelta(seconds=backoff(2)))
+
+        self.assertEqual(drain(now=now + timedelta(seconds=backoff(2)))['sent'], 1)
+        entry.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts), ('sent', 3))
+        self.assertEqual(order.delivery_tracking_id, 'STUB-WAYBILL')
+        self.assertEqual(order.delivery_partner_order_id, 'STUB-WAYBILL')
+        self.assertEqual(order.delivery_status, 'In Transit')
+
+    def test_dead_letters_after_max_attempts(self):
+        order = self.make_order(2, [500] * 3)
+        now = timezone.now()
+        for attempt in range(1, 4):
+            counts = drain(max_attempts=3, now=now)
+            now += timedelta(seconds=backoff(attempt))
+        self.assertEqual(counts['dead'], 1)
+        entry = DeliveryOutbox.objects.get(order=order)
+        order.refresh_from_db()
+        self.assertEqual(entry.status, 'dead')
+        self.assertTrue(entry.last_error)
+        self.assertEqual(order.delivery_status, 'Pending Manual Entry')
+        self.assertEqual(drain(now=now + timedelta(days=1)), {'sent': 0, 'retried': 0, 'dead': 0})
@@ -2,11 +2,21 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
 from .models import Order, OrderItem
-from .serializers import OrderSerializer, CreateOrderSerializer
-from cart.models import Cart, CartItem
+from .serializers import OrderSerializer, OrderItemSerializer, CreateOrderSerializer
+from nextbloom.fieldsets import Fieldset
+from products.serializers import ProductListSerializer
+from cart.models import CartItem
+from cart.summary import invalidate_cart_summary
 from .payment import create_razorpay_order, verify_razorpay_payment
-from .delivery import create_delivery_order
+from .delivery import cancel_delivery_order
+from .outbox import cancel_pending_shipment, enqueue_shipment, shipment_payload
+from .stock import (
+    UNSHIPPED_STATUSES, InsufficientStock, allocate_stock, release_order_stock, reserve_order_stock,
+)
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -14,7 +24,28 @@ class OrderViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        queryset = Order.objects.filter(user=self.request.user)
+        if self.action not in ('list', 'retrieve'):
+            return queryset.prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('product')),
+            )
+
+        # Read only the columns, items and products the response renders
+        fieldset = Fieldset.from_request(self.request)
+        queryset = queryset.only(*OrderSerializer.required_columns(fieldset))
+        if fieldset.includes('user'):
+            queryset = queryset.select_related('user')
+        if fieldset.includes('items'):
+            items_fieldset = fieldset.child('items')
+            columns = ['order', *OrderItemSerializer.required_columns(items_fieldset)]
+            items = OrderItem.objects.all()
+            if items_fieldset.renders('product'):
+                items = items.select_related('product')
+                product_columns = ProductListSerializer.required_columns(items_fieldset.child('product'))
+                columns += [f'product__{column}' for column in product_columns]
+            items = items.only(*columns)
+            queryset = queryset.prefetch_related(Prefetch('items', queryset=items))
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -24,104 +55,100 @@ class OrderViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         serializer = CreateOrderSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
 
-        # Get user's cart
-        try:
-            cart = Cart.objects.get(user=request.user)
-            cart_items = cart.items.all()
-        except Cart.DoesNotExist:
-            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
-
+        # Cart items with their products in one query
+        cart_items = list(CartItem.objects.filter(cart__user=request.user).select_related('product'))
         if not cart_items:
             return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Calculate totals
-        subtotal = sum(item.total_price for item in cart_items)
+        # allocate_stock() skips inactive products, which would otherwise read as a stock shortage
+        unavailable = sorted(item.product_id for item in cart_items if not item.product.is_active)
+        if unavailable:
+            return Response({'error': 'Product unavailable', 'product_ids': unavailable},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Fail fast on stock read with the cart; allocate_stock() below is the authoritative check
+        short = sorted(item.product_id for item in cart_items if item.quantity > item.product.stock)
+        if short:
+            return Response({'error': 'Insufficient stock', 'product_ids': short},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Totals and order lines in one pass
+        order_items = []
+        quantities = {}
+        subtotal = 0
+        for cart_item in cart_items:
+            product = cart_item.product
+            quantities[product.id] = quantities.get(product.id, 0) + cart_item.quantity
+            price = product.final_price
+            line_total = price * cart_item.quantity
+            subtotal += line_total
+            order_items.append(OrderItem(product=product, quantity=cart_item.quantity, price=price, total=line_total))
+
         shipping_cost = 50  # Fixed shipping cost, can be made dynamic
         total = subtotal + shipping_cost
-        payment_method = serializer.validated_data.get('payment_method', 'cod')
+        payment_method = data.get('payment_method', 'cod')
 
-        # Create order
-        order = Order.objects.create(
+        order = Order(
             user=request.user,
+            order_number=Order.generate_order_number(),
             subtotal=subtotal,
             shipping_cost=shipping_cost,
             total=total,
             payment_method=payment_method,
-            payment_status='pending' if payment_method == 'razorpay' else 'pending',
-            shipping_address=serializer.validated_data['shipping_address'],
-            shipping_city=serializer.validated_data['shipping_city'],
-            shipping_state=serializer.validated_data['shipping_state'],
-            shipping_zip_code=serializer.validated_data['shipping_zip_code'],
-            shipping_phone=serializer.validated_data['shipping_phone'],
-            notes=serializer.validated_data.get('notes', ''),
+            payment_status='pending',  # COD is marked paid when the payment is collected
+            # For COD the order goes straight to processing; Razorpay orders wait for payment
+            status='processing' if payment_method == 'cod' else 'pending',
+            shipping_address=data['shipping_address'],
+            shipping_city=data['shipping_city'],
+            shipping_state=data['shipping_state'],
+            shipping_zip_code=data['shipping_zip_code'],
+            shipping_phone=data['shipping_phone'],
+            notes=data.get('notes', ''),
+            stock_allocated=True,
         )
 
-        # Create order items
-        order_items_data = []
-        for cart_item in cart_items:
-            order_item = OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.final_price,
-            )
-            order_items_data.append({
-                'name': cart_item.product.name,
-                'quantity': cart_item.quantity,
-                'price': float(cart_item.product.final_price)
-            })
-
-        # Handle Razorpay payment
+        # The Razorpay call happens before the transaction so no row is written for a failed payment order
+        # and the database transaction is never held open across an HTTP request
         razorpay_order = None
         if payment_method == 'razorpay':
-            razorpay_order = create_razorpay_order(
-                amount=total,
-                receipt=order.order_number
-            )
-            if razorpay_order:
-                order.razorpay_order_id = razorpay_order.get('id')
-                order.save()
-            else:
-                order.delete()
+            razorpay_order = create_razorpay_order(amount=total, receipt=order.order_number)
+            if not razorpay_order:
                 return Response({'error': 'Failed to create payment order'}, 
                               status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            order.razorpay_order_id = razorpay_order.get('id')
+
+        order.delivery_status = 'Pending'
+
+        try:
+            with transaction.atomic():
+                # Every line is allocated or none is; a short line rolls back the whole order
+                allocate_stock(quantities)
+                order.save()
+                for order_item in order_items:
+                    order_item.order = order
+                # Totals are precomputed above; bulk_create skips OrderItem.save()
+                OrderItem.objects.bulk_create(order_items)
+
+                # For COD, clear the cart now and queue the shipment for process_delivery_outbox
+                # For Razorpay, both wait for payment verification
+                if payment_method == 'cod':
+                    CartItem.objects.filter(id__in=[cart_item.id for cart_item in cart_items]).delete()
+                    enqueue_shipment(order, shipment_payload(order, order_items))
+                else:
+                    # Held until the payment is verified or the reservation expires
+                    reserve_order_stock(order, quantities)
+        except InsufficientStock as exc:
+            # Another checkout took the stock after the cart was read
+            return Response({'error': 'Insufficient stock', 'product_ids': exc.product_ids},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        # Create delivery order with Delhivery
-        delivery_data = {
-            'order_id': order.order_number,
-            'delivery_address': serializer.validated_data['shipping_address'],
-            'delivery_city': serializer.validated_data['shipping_city'],
-            'delivery_state': serializer.validated_data['shipping_state'],
-            'delivery_pincode': serializer.validated_data['shipping_zip_code'],
-            'customer_name': f"{request.user.first_name or ''} {request.user.last_name or ''}".strip() or request.user.email,
-            'customer_phone': serializer.validated_data['shipping_phone'],
-            'items': order_items_data,
-            'total_amount': float(total),
-            'payment_method': payment_method
-        }
-        
-        delivery_result = create_delivery_order(delivery_data)
-        if delivery_result.get('success'):
-            order.delivery_partner_order_id = delivery_result.get('order_id')
-            order.delivery_tracking_id = delivery_result.get('tracking_id')
-            order.delivery_status = delivery_result.get('status', 'Pending')
-            order.save()
-        else:
-            # Log error but don't fail the order creation
-            print(f"Delhivery order creation failed: {delivery_result.get('message')}")
-            order.delivery_status = 'Pending Manual Entry'
-            order.save()
-
-        # For COD, mark as processing and clear cart
-        # For Razorpay, cart will be cleared after payment verification
         if payment_method == 'cod':
-            order.status = 'processing'
-            order.payment_status = 'pending'  # Will be updated when payment is collected
-            order.save()
-            cart.items.all().delete()
+            invalidate_cart_summary(request.user.pk)
 
         # Return order details
+        prefetch_related_objects([order], Prefetch('items', queryset=OrderItem.objects.select_related('product')))
         order_serializer = OrderSerializer(order)
         response_data = order_serializer.data
         
@@ -133,3 +160,24 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         return Response(response_data, status=status.HTTP_201_CREATED)
 
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel an unpaid order that has not shipped and return its stock."""
+        order = self.get_object()
+        # Conditional update so a concurrent payment or shipment wins over the cancellation
+        cancelled = Order.objects.filter(
+            pk=order.pk, status__in=UNSHIPPED_STATUSES,
+        ).exclude(payment_status='paid').update(status='cancelled', updated_at=timezone.now())
+        if not cancelled:
+            return Response({'error': 'Order can no longer be cancelled'}, status=status.HTTP_400_BAD_REQUEST)
+        release_order_stock(order.pk)
+
+        cancel_pending_shipment(order.pk)
+        if order.delivery_tracking_id:
+            result = cancel_delivery_order(order.delivery_tracking_id)
+            if not result.get('success'):
+                print(f"Delhivery cancellation failed for {order.order_number}: {result.get('message')}")
+
+        order.refresh_from_db(fields=['status', 'stock_allocated', 'updated_at'])
+        return Response(OrderSerializer(order, context={'request': request}).data)
@@ -2,7 +2,9 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
+from django.db.models import Q, Sum
 from .models import Category, Product, ProductImage
+from .cache import bump_catalog_version
 
 
 class ProductImageInline(admin.TabularInline):
@@ -46,7 +48,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'category', 'price_display', 'stock', 'stock_status', 'is_active', 'is_featured', 'rating', 'created_at')
+    list_display = ('name', 'category', 'price_display', 'stock', 'reserved_stock', 'stock_status', 'is_active', 'is_featured', 'rating', 'created_at')
     list_filter = ('category', 'is_active', 'is_featured', 'created_at', 'rating', 'stock')
     search_fields = ('name', 'description', 'category__name')
     prepopulated_fields = {'slug': ('name',)}
@@ -76,6 +78,17 @@ class ProductAdmin(admin.ModelAdmin):
     )
     readonly_fields = ('created_at', 'updated_at', 'num_reviews')
     
+    def get_queryset(self, request):
+        # Units held for unpaid orders; already excluded from stock
+        return super().get_queryset(request).annotate(
+            reserved=Sum('reservations__quantity', filter=Q(reservations__expires_at__gt=timezone.now()), default=0),
+        )
+    
+    def reserved_stock(self, obj):
+        return obj.reserved
+    reserved_stock.short_description = 'Reserved'
+    reserved_stock.admin_order_field = 'reserved'
+    
     def price_display(self, obj):
         if obj.discount_price:
             return format_html(
@@ -97,29 +110,34 @@ class ProductAdmin(admin.ModelAdmin):
     
     # Admin Actions
     def make_featured(self, request, queryset):
-        updated = queryset.update(is_featured=True)
+        updated = queryset.update(is_featured=True, updated_at=timezone.now())
+        bump_catalog_version()
         self.message_user(request, f'{updated} products marked as featured.')
     make_featured.short_description = 'Mark selected products as featured'
     
     def make_unfeatured(self, request, queryset):
-        updated = queryset.update(is_featured=False)
+        updated = queryset.update(is_featured=False, updated_at=timezone.now())
+        bump_catalog_version()
         self.message_user(request, f'{updated} products unmarked as featured.')
     make_unfeatured.short_description = 'Unmark selected products as featured'
     
     def activate_products(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = queryset.update(is_active=True, updated_at=timezone.now())
+        bump_catalog_version()
         self.message_user(request, f'{updated} products activated.')
     activate_products.short_description = 'Activate selected products'
     
     def deactivate_products(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = queryset.update(is_active=False, updated_at=timezone.now())
+        bump_catalog_version()
         self.message_user(request, f'{updated} products deactivated.')
     deactivate_products.short_description = 'Deactivate selected products'
     
     def restock_products(self, request, queryset):
         # This is a placeholder - you can customize the restock amount
         from django.db.models import F
-        updated = queryset.update(stock=F('stock') + 10)
+        updated = queryset.update(stock=F('stock') + 10, updated_at=timezone.now())
+        bump_catalog_version()
         self.message_user(request, f'Restocked {updated} products (+10 units each).')
     restock_products.short_description = 'Restock selected products (+10 units)'
 
@@ -5,3 +5,5 @@ class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
 
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,87 @@
+"""
+Versioned response cache for the read-only catalog endpoints.
+
+Every cached response is keyed on the full request URL and the current
+catalog version. Any write to products, images or categories bumps the
+version, which makes all earlier entries unreachable without having to find
+and delete them; they simply expire.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CACHE_HITS_KEY = 'catalog:stats:hits'
+CACHE_MISSES_KEY = 'catalog:stats:misses'
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing or evicted; add() keeps concurrent initialisers from clobbering each other
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    return _incr(CATALOG_VERSION_KEY)
+
+
+def get_cache_stats():
+    hits = cache.get(CACHE_HITS_KEY, 0)
+    misses = cache.get(CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'version': get_catalog_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+def reset_cache_stats():
+    cache.delete_many([CACHE_HITS_KEY, CACHE_MISSES_KEY])
+
+
+def catalog_cache_key(request, prefix='response'):
+    url = request.build_absolute_uri()
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f'catalog:{prefix}:{get_catalog_version()}:{digest}'
+
+
+def cache_catalog_response(view_method):
+    """
+    Cache the serialized data of a successful GET view method under the
+    current catalog version. The data is cached rather than the rendered
+    bytes so content negotiation still works on hits.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return view_method(self, request, *args, **kwargs)
+
+        key = catalog_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            _incr(CACHE_HITS_KEY)
+            return Response(data)
+
+        _incr(CACHE_MISSES_KEY)
+        response = view_method(self, request, *args, **kwargs)
+        # Streaming responses have no data to cache
+        if response.status_code == 200 and isinstance(response, Response):
+            cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+        return response
+    return wrapper
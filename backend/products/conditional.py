@@ -0,0 +1,54 @@
+"""
+ETag / Last-Modified support for the catalog endpoints.
+
+Validators come from a single ``Max('updated_at')`` + ``Count('id')``
+aggregate over the rows a response is built from. The count catches rows
+leaving the set, which the maximum alone would miss. When the client's
+validators match, a 304 is returned before any serializer runs.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def get_validators(request, queryset):
+    state = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('id'))
+    last_modified = state['last_modified']
+    fingerprint = '|'.join([
+        request.build_absolute_uri(),
+        request.META.get('HTTP_ACCEPT', ''),
+        last_modified.isoformat() if last_modified else '',
+        str(state['count']),
+    ])
+    etag = '"%s"' % hashlib.md5(fingerprint.encode('utf-8')).hexdigest()
+    return etag, last_modified
+
+
+def conditional_catalog_response(view_method):
+    """
+    Answer GETs with 304 Not Modified when the client's validators match
+    ``view.get_conditional_queryset()``, and add ETag/Last-Modified otherwise.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return view_method(self, request, *args, **kwargs)
+
+        etag, last_modified = get_validators(request, self.get_conditional_queryset())
+        last_modified_timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified_timestamp
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified_timestamp is not None:
+                response['Last-Modified'] = http_date(last_modified_timestamp)
+        return response
+    return wrapper
@@ -0,0 +1,71 @@
+"""
+Facet counts for the product grid.
+
+Every facet comes from one query: rows are grouped by category, and the
+featured, on-sale, in-stock and price-band counts are conditional
+aggregates in the same SELECT. Catalog-wide totals are then summed in
+Python from the per-category rows.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Q
+
+# Lower edges of the price bands on final_price; the last band is open-ended
+PRICE_BAND_EDGES = (Decimal('0'), Decimal('100'), Decimal('250'), Decimal('500'), Decimal('1000'))
+
+
+def price_bands():
+    bands = []
+    for index, lower in enumerate(PRICE_BAND_EDGES):
+        upper = PRICE_BAND_EDGES[index + 1] if index + 1 < len(PRICE_BAND_EDGES) else None
+        condition = Q(final_price__gte=lower)
+        if upper is not None:
+            condition &= Q(final_price__lt=upper)
+        bands.append((f'band_{index}', lower, upper, condition))
+    return bands
+
+
+def compute_facets(queryset):
+    bands = price_bands()
+    aggregates = {
+        'count': Count('id'),
+        'featured': Count('id', filter=Q(is_featured=True)),
+        'on_sale': Count('id', filter=Q(discount_price__isnull=False)),
+        'in_stock': Count('id', filter=Q(stock__gt=0)),
+    }
+    for name, lower, upper, condition in bands:
+        aggregates[name] = Count('id', filter=condition)
+
+    rows = list(
+        queryset.order_by()
+        .values('category_id', 'category__name', 'category__slug')
+        .annotate(**aggregates)
+        .order_by('category__name')
+    )
+
+    def total(name):
+        return sum(row[name] for row in rows)
+
+    return {
+        'total': total('count'),
+        'categories': [
+            {
+                'id': row['category_id'],
+                'name': row['category__name'],
+                'slug': row['category__slug'],
+                'count': row['count'],
+            }
+            for row in rows
+        ],
+        'price_bands': [
+            {
+                'min': str(lower),
+                'max': str(upper) if upper is not None else None,
+                'count': total(name),
+            }
+            for name, lower, upper, condition in bands
+        ],
+        'featured': total('featured'),
+        'on_sale': total('on_sale'),
+        'in_stock': total('in_stock'),
+    }
@@ -0,0 +1,11 @@
+from django_filters import rest_framework as filters
+from .models import Product
+
+
+class ProductFilter(filters.FilterSet):
+    min_price = filters.NumberFilter(field_name='final_price', lookup_expr='gte')
+    max_price = filters.NumberFilter(field_name='final_price', lookup_expr='lte')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'is_featured']
@@ -0,0 +1,111 @@
+"""
+Sharded stock for flash sales.
+
+Normally a product's stock is the single Product.stock column and every
+checkout decrements that one row, so checkouts for a hot product queue on
+its row lock. start_flash_sale() spreads a product's stock over N
+StockShard rows and records N in Product.stock_shards. From then on
+orders.stock takes each line from a random shard that still has enough,
+with a conditional UPDATE, so concurrent checkouts mostly lock different
+rows.
+
+During the sale Product.stock is a snapshot used for display and the
+cart's stock checks. reconcile_shards(), run periodically through
+``manage.py flash_sale reconcile``, copies the shard totals back into it,
+setting updated_at and bumping the catalog version when a total moved. A
+hot product's cached responses and ETags change once per reconcile
+instead of on every order.
+end_flash_sale() folds the shards into Product.stock and deletes them.
+Stock edited in the admin mid-sale is overwritten by the next reconcile;
+end the sale, restock and start it again instead.
+
+Each line is served from a single shard. Close to selling out, an order
+can therefore be refused while its units are spread over several shards
+and no one shard holds enough.
+"""
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Now
+from .cache import bump_catalog_version
+from .models import Product, StockShard
+
+DEFAULT_SHARDS = 8
+# Conditional updates tried before a line is refused; a retry only happens when
+# another checkout drained the chosen shard in between
+SHARD_ATTEMPTS = 3
+
+
+def _random_shard(product_id, quantity):
+    return Subquery(
+        StockShard.objects.filter(product_id=product_id, stock__gte=quantity).order_by('?').values('id')[:1]
+    )
+
+
+def _shard_total():
+    return Coalesce(Subquery(
+        StockShard.objects.filter(product=OuterRef('pk')).order_by()
+        .values('product').annotate(total=Sum('stock')).values('total')
+    ), 0)
+
+
+def start_flash_sale(product_ids, shards=DEFAULT_SHARDS):
+    """Spread the stock of ``product_ids`` over ``shards`` rows each. Returns the number of products moved."""
+    with transaction.atomic():
+        products = list(
+            Product.objects.select_for_update().filter(id__in=product_ids, stock_shards=0).values_list('id', 'stock')
+        )
+        StockShard.objects.bulk_create(
+            StockShard(product_id=product_id, shard=index,
+                       stock=stock // shards + (1 if index < stock % shards else 0))
+            for product_id, stock in products for index in range(shards)
+        )
+        Product.objects.filter(id__in=[product_id for product_id, stock in products]).update(stock_shards=shards)
+    return len(products)
+
+
+def end_flash_sale(product_ids):
+    """Fold the shards of ``product_ids`` back into Product.stock. Returns the number of products moved."""
+    with transaction.atomic():
+        product_ids = list(
+            Product.objects.select_for_update().filter(id__in=product_ids, stock_shards__gt=0)
+            .values_list('id', flat=True)
+        )
+        # Lock the shards too, so no checkout decrements one between the sum and the delete
+        list(StockShard.objects.select_for_update().filter(product_id__in=product_ids).values_list('id'))
+        Product.objects.filter(id__in=product_ids).update(stock=_shard_total(), stock_shards=0, updated_at=Now())
+        StockShard.objects.filter(product_id__in=product_ids).delete()
+        if product_ids:
+            transaction.on_commit(bump_catalog_version)
+    return len(product_ids)
+
+
+def reconcile_shards(product_ids=None):
+    """
+    Copy shard totals into Product.stock for flash-sale products whose total
+    has changed. Returns the number updated.
+    """
+    queryset = Product.objects.filter(stock_shards__gt=0)
+    if product_ids:
+        queryset = queryset.filter(id__in=product_ids)
+    with transaction.atomic():
+        # Only touch products whose total moved, so an idle sale keeps its ETags and cache entries
+        changed = list(queryset.annotate(total=_shard_total()).exclude(stock=F('total')).values_list('id', flat=True))
+        Product.objects.filter(id__in=changed).update(stock=_shard_total(), updated_at=Now())
+        if changed:
+            transaction.on_commit(bump_catalog_version)
+    return len(changed)
+
+
+def take_from_shards(product_id, quantity):
+    """Take ``quantity`` units from one shard. Returns False if no shard has that many left."""
+    for _ in range(SHARD_ATTEMPTS):
+        if StockShard.objects.filter(id=_random_shard(product_id, quantity), stock__gte=quantity).update(
+            stock=F('stock') - quantity,
+        ):
+            return True
+    return False
+
+
+def return_to_shards(product_id, quantity):
+    """Put ``quantity`` units back on a random shard."""
+    StockShard.objects.filter(id=_random_shard(product_id, 0)).update(stock=F('stock') + quantity)
@@ -0,0 +1,176 @@
+"""
+Fast rendering path for product list pages.
+
+ProductListSerializer builds a serializer and a field tree per request and
+calls every field's to_representation for every row. For list pages,
+ProductRowRenderer reads plain ``.values()`` rows holding only the needed
+columns and builds the same dicts directly. URL prefixes and the field
+order are computed once per request. The JSON it produces is identical to
+the serializer's output.
+
+Both paths honour ``?fields=`` and ``?expand=``: only the columns the
+requested fields read are selected.
+"""
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+from nextbloom.fieldsets import Fieldset
+from .models import Category
+from .serializers import CategorySerializer, ProductListSerializer
+
+# Ordering/cursor keys list pages may sort on; always selected so keyset cursors can be built
+CURSOR_COLUMNS = ('id', 'price', 'final_price', 'rating', 'created_at')
+
+
+def list_columns(fieldset):
+    """Columns for the requested fields plus the cursor keys."""
+    columns = ProductListSerializer.required_columns(fieldset)
+    return tuple(columns + [column for column in CURSOR_COLUMNS if column not in columns])
+
+
+# Columns of full, unpruned rows
+LIST_COLUMNS = list_columns(Fieldset())
+
+
+class ProductRowRenderer:
+    def __init__(self, context):
+        self.context = context
+        self.request = context.get('request')
+        self.fieldset = Fieldset.from_request(self.request)
+        self.columns = list_columns(self.fieldset)
+        self.category_fieldset = self.fieldset.child('category')
+        self.category_fields = [field for field in CategorySerializer.Meta.fields
+                                if self.category_fieldset.includes(field)]
+        # FileSystemStorage.url() is base_url + the quoted name; resolve the base once
+        media_url = default_storage.url('')
+        self.media_prefix = self.request.build_absolute_uri(media_url) if self.request else media_url
+        if self.fieldset.is_default:
+            self.render = self.render_full
+        else:
+            self.render = self.render_sparse
+            self.getters = [
+                (name, self.getter(name))
+                for name in ProductListSerializer.Meta.fields if self.fieldset.includes(name)
+            ]
+
+    def getter(self, name):
+        if name in ProductListSerializer.expandable_fields and not self.fieldset.expands(name):
+            return getattr(self, f'get_{name}_id')
+        return getattr(self, f'get_{name}')
+
+    def media_url(self, name):
+        return self.media_prefix + filepath_to_uri(name) if name else None
+
+    def category(self, row):
+        summary = row['category_summary']
+        if not summary:
+            category = Category.objects.get(pk=row['category_id'])
+            return CategorySerializer(category, context=self.context, fieldset=self.category_fieldset).data
+        data = {field: summary.get(field) for field in self.category_fields}
+        if 'image' in data:
+            data['image'] = self.media_url(data['image'])
+        return data
+
+    def primary_image(self, row):
+        # Same rules as ProductSnapshotMixin.get_primary_image
+        if not self.request:
+            return None
+        return self.media_url(row['primary_image_path'] or row['image'])
+
+    def render_full(self, row):
+        price = row['price']
+        discount_price = row['discount_price']
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'slug': row['slug'],
+            'category': self.category(row),
+            # Decimals come back from the database already quantized to two places
+            'price': format(price, 'f'),
+            'discount_price': format(discount_price, 'f') if discount_price is not None else None,
+            # final_price is a ReadOnlyField, which the JSON encoder emits as a float
+            'final_price': float(row['final_price']),
+            'discount_percentage': (
+                int(((price - discount_price) / price) * 100) if discount_price and price else 0
+            ),
+            'stock': row['stock'],
+            'image': self.media_url(row['image']),
+            'primary_image': self.primary_image(row),
+            'is_featured': row['is_featured'],
+            'rating': format(row['rating'], 'f'),
+            'num_reviews': row['num_reviews'],
+        }
+
+    def render_sparse(self, row):
+        return {name: getter(row) for name, getter in self.getters}
+
+    # Per-field getters for sparse rows, matching render_full()
+    def get_id(self, row):
+        return row['id']
+
+    def get_name(self, row):
+        return row['name']
+
+    def get_slug(self, row):
+        return row['slug']
+
+    def get_category(self, row):
+        return self.category(row)
+
+    def get_category_id(self, row):
+        return row['category_id']
+
+    def get_price(self, row):
+        return format(row['price'], 'f')
+
+    def get_discount_price(self, row):
+        return format(row['discount_price'], 'f') if row['discount_price'] is not None else None
+
+    def get_final_price(self, row):
+        return float(row['final_price'])
+
+    def get_discount_percentage(self, row):
+        price, discount_price = row['price'], row['discount_price']
+        return int(((price - discount_price) / price) * 100) if discount_price and price else 0
+
+    def get_stock(self, row):
+        return row['stock']
+
+    def get_image(self, row):
+        return self.media_url(row['image'])
+
+    def get_primary_image(self, row):
+        return self.primary_image(row)
+
+    def get_is_featured(self, row):
+        return row['is_featured']
+
+    def get_rating(self, row):
+        return format(row['rating'], 'f')
+
+    def get_num_reviews(self, row):
+        return row['num_reviews']
+
+    def render_many(self, rows):
+        return [self.render(row) for row in rows]
+
+
+def supports_fast_rows(serializer_class):
+    """Only ProductListSerializer output is mirrored by ProductRowRenderer."""
+    return serializer_class is ProductListSerializer and isinstance(default_storage, FileSystemStorage)
+
+
+def prepare_list(queryset, serializer_class, context, extra_columns=()):
+    """
+    Return the queryset to paginate or stream together with a callable that
+    renders one of its rows, using the fast path whenever it applies.
+    ``extra_columns`` are loaded even when the requested fields omit them.
+    """
+    if supports_fast_rows(serializer_class):
+        renderer = ProductRowRenderer(context)
+        extra_columns = [column for column in extra_columns if column not in renderer.columns]
+        return queryset.values(*renderer.columns, *extra_columns), renderer.render
+    serializer = serializer_class(context=context)
+    if hasattr(serializer, 'required_columns'):
+        queryset = queryset.only(*serializer.required_columns(serializer.fieldset), *CURSOR_COLUMNS,
+                                 *extra_columns)
+    return queryset, serializer.to_representation
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from products.models import Category, Product, ProductImage
+from products.cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized primary image path and category summary on every product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of products written per bulk update')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        summaries = {category.id: category.summary() for category in Category.objects.all()}
+
+        # Walk newest first so the lowest-id primary image wins, matching .first()
+        primary_paths = {}
+        for product_id, image in ProductImage.objects.filter(is_primary=True).order_by('-id').values_list('product_id', 'image'):
+            primary_paths[product_id] = image
+
+        # bulk_update skips auto_now, so updated_at is set here to move the catalog ETag/Last-Modified
+        now = timezone.now()
+        fields = ['primary_image_path', 'category_summary', 'updated_at']
+        batch = []
+        updated_count = 0
+        products = Product.objects.only('id', 'category_id', 'primary_image_path', 'category_summary', 'updated_at')
+        for product in products.iterator(chunk_size=batch_size):
+            primary_image_path = primary_paths.get(product.id, '')
+            category_summary = summaries[product.category_id]
+            if (product.primary_image_path, product.category_summary) == (primary_image_path, category_summary):
+                continue
+            product.primary_image_path = primary_image_path
+            product.category_summary = category_summary
+            product.updated_at = now
+            batch.append(product)
+            if len(batch) >= batch_size:
+                Product.objects.bulk_update(batch, fields)
+                updated_count += len(batch)
+                batch = []
+        if batch:
+            Product.objects.bulk_update(batch, fields)
+            updated_count += len(batch)
+        bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled snapshots for {updated_count} products'))
@@ -0,0 +1,77 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from nextbloom.benchmarks import throwaway_database
+from products.list_rows import LIST_COLUMNS, ProductRowRenderer
+from products.models import Category, Product
+from products.serializers import ProductListSerializer
+
+ROW_COUNTS = (20, 100, 1000)
+
+
+class Command(BaseCommand):
+    help = ('Compares per-row rendering cost of ProductListSerializer with the values() '
+            'fast path at 20, 100 and 1000 rows, and checks both render identical JSON. '
+            'The synthetic products live in a throwaway test database that is created and '
+            'dropped around it.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with throwaway_database(self.stdout):
+            category = self.build_catalog(max(ROW_COUNTS))
+            self.run(category, options['repeat'])
+
+    def build_catalog(self, count):
+        rng = random.Random(7)
+        category = Category.objects.create(name='Benchmark Rows', slug='benchmark-rows',
+                                           image='categories/benchmark.png')
+        summary = category.summary()
+        products = []
+        for i in range(count):
+            price = Decimal(rng.randint(1000, 99999)) / 100
+            discount_price = (price * Decimal('0.8')).quantize(Decimal('0.01')) if i % 3 else None
+            products.append(Product(
+                name=f'Benchmark row {i} ☕', slug=f'benchmark-rows-{i}', description='benchmark',
+                category=category, category_summary=summary, price=price,
+                discount_price=discount_price, final_price=discount_price or price,
+                stock=rng.randint(0, 50), image=f'products/row {i}.jpg' if i % 2 else None,
+                primary_image_path=f'products/primary-{i}.jpg' if i % 4 else '',
+                rating=Decimal(rng.randint(0, 500)) / 100,
+            ))
+        Product.objects.bulk_create(products)
+        return category
+
+    def run(self, category, repeat):
+        request = Request(APIRequestFactory().get('/api/products/'))
+        context = {'request': request}
+        renderer = JSONRenderer()
+        queryset = Product.objects.filter(category=category).order_by('-created_at', '-id')
+
+        self.stdout.write(f'{"rows":>6} {"serializer us/row":>18} {"fast path us/row":>17} {"speedup":>8}')
+        for count in ROW_COUNTS:
+            instances = list(queryset[:count])
+            rows = list(queryset.values(*LIST_COLUMNS)[:count])
+
+            slow = renderer.render(ProductListSerializer(instances, many=True, context=context).data)
+            fast = renderer.render(ProductRowRenderer(context).render_many(rows))
+            if slow != fast:
+                raise CommandError(f'Fast path output differs from ProductListSerializer at {count} rows')
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                ProductListSerializer(instances, many=True, context=context).data
+            slow_cost = (time.perf_counter() - started) / (repeat * count) * 1e6
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                ProductRowRenderer(context).render_many(rows)
+            fast_cost = (time.perf_counter() - started) / (repeat * count) * 1e6
+
+            self.stdout.write(f'{count:>6} {slow_cost:>18.1f} {fast_cost:>17.1f} {slow_cost / fast_cost:>7.1f}x')
@@ -0,0 +1,79 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from nextbloom.benchmarks import throwaway_database
+from products.models import Category, Product
+from products.search import ProductSearchFilter, get_search_backend
+from products.views import ProductViewSet
+
+WORDS = [
+    'organic', 'fresh', 'apple', 'banana', 'mango', 'tomato', 'spinach', 'milk', 'cheese',
+    'bread', 'butter', 'honey', 'almond', 'cashew', 'rice', 'wheat', 'juice', 'tea', 'coffee',
+    'chicken', 'fish', 'paneer', 'yogurt', 'cookie', 'chips', 'premium', 'farm', 'natural',
+    'crunchy', 'sweet', 'spicy', 'green', 'red', 'golden', 'whole', 'low', 'fat', 'sugar',
+]
+QUERIES = ['apple', 'organic honey', 'fresh green spinach', 'premium almond butter', 'choco']
+
+
+class Command(BaseCommand):
+    help = ('Compares full-text product search with the plain icontains SearchFilter '
+            'on a synthetic catalog, built in a throwaway test database that is created and '
+            'dropped around it.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with throwaway_database(self.stdout):
+            self.build_catalog(options['products'])
+            self.run(options['repeat'])
+
+    def build_catalog(self, count):
+        self.stdout.write(f'Building synthetic catalog of {count} products...')
+        rng = random.Random(42)
+        category = Category.objects.create(name='Benchmark', slug='benchmark-search')
+        summary = category.summary()
+        batch = []
+        for i in range(count):
+            price = rng.randint(10, 1000)
+            batch.append(Product(
+                name=' '.join(rng.sample(WORDS, 3)).title(),
+                slug=f'benchmark-search-{i}',
+                description=' '.join(rng.choices(WORDS, k=30)),
+                category=category,
+                category_summary=summary,
+                price=price,
+                final_price=price,
+                stock=rng.randint(0, 100),
+            ))
+            if len(batch) == 1000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        # bulk_create skips signals, so index everything in one pass
+        backend = get_search_backend()
+        if backend:
+            backend.rebuild()
+
+    def run(self, repeat):
+        factory = APIRequestFactory()
+        view = ProductViewSet()
+        queryset = Product.objects.filter(is_active=True)
+
+        self.stdout.write(f'{"query":<25} {"SearchFilter ms":>16} {"full-text ms":>14} {"hits":>8}')
+        for query in QUERIES:
+            request = Request(factory.get('/api/products/', {'search': query}))
+            timings = []
+            for filter_backend in (filters.SearchFilter(), ProductSearchFilter()):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    results = filter_backend.filter_queryset(request, queryset, view)
+                    hits = results.count()
+                    list(results[:20])
+                timings.append((time.perf_counter() - started) * 1000 / repeat)
+            self.stdout.write(f'{query:<25} {timings[0]:>16.1f} {timings[1]:>14.1f} {hits:>8}')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from products.flash_sale import DEFAULT_SHARDS, end_flash_sale, reconcile_shards, start_flash_sale
+
+
+class Command(BaseCommand):
+    help = ('Starts or ends flash-sale mode, which spreads the stock of hot products over sharded '
+            'counter rows, or reconciles Product.stock with the shard totals. Run "reconcile" '
+            'every minute or so while a sale is on.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('start', 'end', 'reconcile'))
+        parser.add_argument('product_ids', nargs='*', type=int,
+                            help='Products to start or end; reconcile defaults to every flash-sale product')
+        parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS)
+
+    def handle(self, *args, **options):
+        action = options['action']
+        product_ids = options['product_ids']
+        if action != 'reconcile' and not product_ids:
+            raise CommandError(f'{action} needs at least one product id')
+        if options['shards'] < 1:
+            raise CommandError('--shards must be at least 1')
+
+        if action == 'start':
+            count = start_flash_sale(product_ids, options['shards'])
+            self.stdout.write(self.style.SUCCESS(f'Started flash sale for {count} products '
+                                                 f'with {options["shards"]} shards each'))
+        elif action == 'end':
+            count = end_flash_sale(product_ids)
+            self.stdout.write(self.style.SUCCESS(f'Ended flash sale for {count} products'))
+        else:
+            count = reconcile_shards(product_ids)
+            self.stdout.write(self.style.SUCCESS(f'Reconciled stock for {count} products'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+from products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text product search index'
+
+    def handle(self, *args, **kwargs):
+        backend = get_search_backend()
+        if backend is None:
+            raise CommandError('No full-text search backend is available for this database')
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index using {type(backend).__name__}'))
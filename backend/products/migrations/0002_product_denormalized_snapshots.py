@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+def backfill_snapshots(apps, schema_editor):
+    """Populate primary_image_path and category_summary for existing products"""
+    Category = apps.get_model('products', 'Category')
+    Product = apps.get_model('products', 'Product')
+    ProductImage = apps.get_model('products', 'ProductImage')
+
+    for category in Category.objects.all():
+        Product.objects.filter(category=category).update(category_summary={
+            'id': category.id,
+            'name': category.name,
+            'slug': category.slug,
+            'description': category.description,
+            'image': category.image.name or None,
+            'is_active': category.is_active,
+        })
+    for image in ProductImage.objects.filter(is_primary=True).order_by('-id'):
+        Product.objects.filter(pk=image.product_id).update(primary_image_path=image.image.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='category_summary',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Create the full-text index used by products.search for this database"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE products_product_fts USING fts5("
+            "name, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            'INSERT INTO products_product_fts (rowid, name, description) '
+            'SELECT id, name, description FROM products_product'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX products_product_search_idx ON products_product USING GIN (('
+            "setweight(to_tsvector('english', coalesce(products_product.name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(products_product.description, '')), 'B')))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS products_product_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS products_product_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_denormalized_snapshots'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:58
+
+from django.db import migrations, models
+from django.db.models import Case, F, When
+
+
+def backfill_final_price(apps, schema_editor):
+    """Mirror Product.save(): the discount price when set and non-zero, else the list price"""
+    Product = apps.get_model('products', 'Product')
+    Product.objects.update(final_price=Case(
+        When(discount_price__gt=0, then=F('discount_price')),
+        default=F('price'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='final_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_final_price, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'final_price'], name='product_active_cat_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['final_price'], name='product_active_price_idx'),
+        ),
+    ]
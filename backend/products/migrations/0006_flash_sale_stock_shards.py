@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_shards',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('stock', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='products.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stockshard',
+            constraint=models.UniqueConstraint(fields=('product', 'shard'), name='stock_shard_product_shard_uniq'),
+        ),
+    ]
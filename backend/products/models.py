@@ -18,6 +18,17 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def summary(self):
+        """Compact snapshot stored on each product as ``category_summary``."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'slug': self.slug,
+            'description': self.description,
+            'image': self.image.name or None,
+            'is_active': self.is_active,
+        }
+
 
 class Product(models.Model):
     name = models.CharField(max_length=200)
@@ -27,6 +38,8 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     discount_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, 
                                          validators=[MinValueValidator(0)])
+    # Effective selling price, maintained by save() so it can be sorted and filtered in SQL
+    final_price = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
     stock = models.PositiveIntegerField(default=0)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
@@ -34,18 +47,49 @@ class Product(models.Model):
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00,
                                  validators=[MinValueValidator(0), MaxValueValidator(5)])
     num_reviews = models.PositiveIntegerField(default=0)
+    # Number of StockShard rows holding this product's stock during a flash sale; 0 means stock is authoritative
+    stock_shards = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Denormalized for list rendering, kept in sync by products.signals
+    primary_image_path = models.CharField(max_length=100, blank=True, default='', editable=False)
+    category_summary = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        # Partial on is_active: Django renders is_active=True as a bare column test,
+        # which SQLite only matches against an index condition, not a key column
+        indexes = [
+            models.Index(fields=['category', 'final_price'], condition=models.Q(is_active=True),
+                         name='product_active_cat_price_idx'),
+            models.Index(fields=['final_price'], condition=models.Q(is_active=True),
+                         name='product_active_price_idx'),
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True),
+                         name='product_active_created_idx'),
+            models.Index(fields=['category', 'created_at'], condition=models.Q(is_active=True),
+                         name='product_active_cat_created_idx'),
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True, is_featured=True),
+                         name='product_featured_created_idx'),
+            models.Index(fields=['created_at'],
+                         condition=models.Q(is_active=True, discount_price__isnull=False),
+                         name='product_on_sale_created_idx'),
+            models.Index(fields=['price'], condition=models.Q(is_active=True),
+                         name='product_active_list_price_idx'),
+            models.Index(fields=['rating'], condition=models.Q(is_active=True),
+                         name='product_active_rating_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
-    @property
-    def final_price(self):
-        return self.discount_price if self.discount_price else self.price
+    def save(self, *args, **kwargs):
+        self.final_price = self.discount_price if self.discount_price else self.price
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.category_summary = self.category.summary()
+        elif {'price', 'discount_price'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'final_price'}
+        super().save(*args, **kwargs)
 
     @property
     def discount_percentage(self):
@@ -63,3 +107,22 @@ class ProductImage(models.Model):
     def __str__(self):
         return f"{self.product.name} - Image {self.id}"
 
+
+class StockShard(models.Model):
+    """
+    One slice of a flash-sale product's stock. Checkouts take units from a
+    random shard, so they contend on N rows instead of one. See
+    products.flash_sale.
+    """
+    # Covered by the (product, shard) unique index
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='shards', db_index=False)
+    shard = models.PositiveSmallIntegerField()
+    stock = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shard'], name='stock_shard_product_shard_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} shard {self.shard}: {self.stock}"
@@ -0,0 +1,144 @@
+"""
+Full-text search backends for the product catalog.
+
+The backend is picked from the database vendor (SQLite FTS5 or a PostgreSQL
+tsvector/GIN expression index) unless ``PRODUCT_SEARCH_BACKEND`` names one
+explicitly. When no backend applies, ProductSearchFilter falls back to DRF's
+plain ``icontains`` SearchFilter.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+SEARCH_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class BaseSearchBackend:
+    """
+    Interface for product search backends. ``search`` receives a query with
+    at least one word and must filter the queryset to matching products and
+    add a ``search_rank`` column where a higher value means a better match.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def index_product(self, product):
+        pass
+
+    def remove_product(self, product_id):
+        pass
+
+    def rebuild(self):
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """BM25-ranked search over an FTS5 table keyed by product id."""
+
+    table = 'products_product_fts'
+    # bm25() column weights: a hit in the name counts ten times one in the description
+    rank_sql = f'-bm25({table}, 10.0, 1.0)'
+
+    @staticmethod
+    def build_match_query(query):
+        # Quote every token so user input can never be parsed as FTS5 syntax,
+        # and prefix-match it so partial words still hit
+        tokens = SEARCH_TOKEN_RE.findall(query)
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def search(self, queryset, query):
+        return queryset.extra(
+            select={'search_rank': self.rank_sql},
+            tables=[self.table],
+            where=[f'{self.table}.rowid = products_product.id', f'{self.table} MATCH %s'],
+            params=[self.build_match_query(query)],
+        )
+
+    def index_product(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {self.table} (rowid, name, description) VALUES (%s, %s, %s)',
+                [product.pk, product.name, product.description],
+            )
+
+    def remove_product(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [product_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description) '
+                'SELECT id, name, description FROM products_product'
+            )
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Ranked search over a GIN expression index. PostgreSQL maintains the index
+    on every write, so no per-save work is needed here.
+    """
+
+    index_name = 'products_product_search_idx'
+    # Must match the indexed expression exactly for the planner to use the index
+    vector_sql = (
+        "setweight(to_tsvector('english', coalesce(products_product.name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(products_product.description, '')), 'B')"
+    )
+
+    def search(self, queryset, query):
+        return queryset.extra(
+            select={'search_rank': f"ts_rank_cd({self.vector_sql}, websearch_to_tsquery('english', %s), 32)"},
+            select_params=[query],
+            where=[f"{self.vector_sql} @@ websearch_to_tsquery('english', %s)"],
+            params=[query],
+        )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {self.index_name}')
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTS5Backend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    """Return the configured search backend, or None to use plain SearchFilter."""
+    backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', '')
+    if backend_path:
+        return import_string(backend_path)()
+    backend_class = VENDOR_BACKENDS.get(connection.vendor)
+    return backend_class() if backend_class else None
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that delegates to the full-text search backend and orders
+    results by relevance unless the client asked for an explicit ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend()
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if not SEARCH_TOKEN_RE.search(query):
+            return queryset.none()
+
+        queryset = backend.search(queryset, query)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by('-search_rank', '-id')
+        return queryset
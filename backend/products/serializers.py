@@ -1,20 +1,54 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from nextbloom.fieldsets import SparseFieldsetMixin
 from .models import Category, Product, ProductImage
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ('id', 'name', 'slug', 'description', 'image', 'is_active')
 
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductImage
         fields = ('id', 'image', 'is_primary')
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSnapshotMixin:
+    """
+    Renders ``primary_image`` and ``category`` from the denormalized columns on
+    Product, so list pages never read ProductImage or Category rows.
+    """
+
+    def get_primary_image(self, obj):
+        request = self.context.get('request')
+        if not request:
+            return None
+        if obj.primary_image_path:
+            return request.build_absolute_uri(default_storage.url(obj.primary_image_path))
+        # Fallback to main product image
+        if obj.image:
+            return request.build_absolute_uri(obj.image.url)
+        return None
+
+    def get_category(self, obj):
+        fieldset = self.fieldset.child('category')
+        summary = obj.category_summary
+        if not summary:
+            return CategorySerializer(obj.category, context=self.context, fieldset=fieldset).data
+        # Rebuild in serializer field order; jsonb does not preserve key order
+        data = {field: summary.get(field) for field in CategorySerializer.Meta.fields
+                if fieldset.includes(field)}
+        if data.get('image'):
+            url = default_storage.url(data['image'])
+            request = self.context.get('request')
+            data['image'] = request.build_absolute_uri(url) if request else url
+        return data
+
+
+class ProductSerializer(ProductSnapshotMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), source='category', write_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
@@ -29,22 +63,15 @@ class ProductSerializer(serializers.ModelSerializer):
                   'stock', 'image', 'images', 'primary_image', 'is_active', 'is_featured', 
                   'rating', 'num_reviews', 'created_at', 'updated_at')
 
-    def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(primary_image.image.url)
-        # Fallback to main product image
-        if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-        return None
+    expandable_fields = ('category',)
+    field_sources = {
+        'discount_percentage': ('price', 'discount_price'),
+        'primary_image': ('primary_image_path', 'image'),
+    }
 
 
-class ProductListSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
+class ProductListSerializer(ProductSnapshotMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    category = serializers.SerializerMethodField()
     final_price = serializers.ReadOnlyField()
     discount_percentage = serializers.ReadOnlyField()
     primary_image = serializers.SerializerMethodField()
@@ -55,16 +82,9 @@ class ProductListSerializer(serializers.ModelSerializer):
                   'final_price', 'discount_percentage', 'stock', 'image', 
                   'primary_image', 'is_featured', 'rating', 'num_reviews')
 
-    def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(primary_image.image.url)
-        # Fallback to main product image
-        if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-        return None
-
+    expandable_fields = ('category',)
+    field_sources = {
+        'category': ('category_id', 'category_summary'),
+        'discount_percentage': ('price', 'discount_price'),
+        'primary_image': ('primary_image_path', 'image'),
+    }
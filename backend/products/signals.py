@@ -0,0 +1,56 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Category, Product, ProductImage
+from .search import get_search_backend
+from .cache import bump_catalog_version
+
+
+def sync_primary_image_path(product_id):
+    primary_image = ProductImage.objects.filter(product_id=product_id, is_primary=True).order_by('id').first()
+    Product.objects.filter(pk=product_id).update(
+        primary_image_path=primary_image.image.name if primary_image else '',
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    sync_primary_image_path(instance.product_id)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    # Deleting a category cascades to its products, so only saves need syncing
+    Product.objects.filter(category=instance).update(
+        category_summary=instance.summary(),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, update_fields=None, **kwargs):
+    # Only reindex when a searchable column may have changed
+    if update_fields is not None and not {'name', 'description'} & set(update_fields):
+        return
+    backend = get_search_backend()
+    if backend:
+        backend.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    backend = get_search_backend()
+    if backend:
+        backend.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
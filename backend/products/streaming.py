@@ -0,0 +1,30 @@
+"""
+Streaming JSON responses for large product listings.
+
+With ``?stream=true`` a listing is written out as one JSON array, row by
+row, from ``queryset.iterator()``. Only one chunk of rows is held in memory
+at a time, however large the result.
+"""
+from django.http import StreamingHttpResponse
+from nextbloom.renderers import dumps
+
+STREAM_QUERY_PARAM = 'stream'
+STREAM_CHUNK_SIZE = 500
+
+
+def wants_stream(request):
+    return request.query_params.get(STREAM_QUERY_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def stream_json_array(queryset, render, chunk_size=STREAM_CHUNK_SIZE):
+    """``render`` turns one row of ``queryset`` into its JSON-ready dict."""
+    def generate():
+        # Rows are encoded like normal API responses so both outputs match
+        yield b'['
+        separator = b''
+        for row in queryset.iterator(chunk_size=chunk_size):
+            yield separator + dumps(render(row))
+            separator = b','
+        yield b']'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
@@ -0,0 +1,156 @@
+import re
+from unittest import skipUnless
+
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from cart.models import Cart, CartItem
+from orders.models import Order
+from .models import Category, Product, ProductImage
+
+# Large tables that must never be read with a plain full scan or sorted in a temp b-tree
+HOT_TABLES = ('products_product', 'orders_order', 'orders_orderitem', 'cart_cart', 'cart_cartitem')
+FULL_SCAN_RE = re.compile(r'\bSCAN (\w+)\b(?! USING)')
+
+
+class ProductListQueryCountTests(TestCase):
+    """A page of products costs the same number of queries however many rows it holds."""
+
+    def build_category(self, slug, count):
+        category = Category.objects.create(name=slug, slug=slug)
+        for i in range(count):
+            product = Product.objects.create(
+                name=f'{slug} {i}', slug=f'{slug}-{i}', description='query count', category=category,
+                price=100 + i, discount_price=50 if i % 2 else None, stock=10,
+            )
+            ProductImage.objects.create(product=product, image=f'products/{slug}-{i}.jpg', is_primary=True)
+        return category
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries), response
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        small = self.build_category('small-page', 2)
+        large = self.build_category('large-page', 20)
+
+        for params in ('', '?expand=', '?fields=id,name,primary_image'):
+            small_count, response = self.count_queries(f'/api/products/categories/{small.id}/products/{params}')
+            self.assertEqual(len(response.data['results']), 2)
+            large_count, response = self.count_queries(f'/api/products/categories/{large.id}/products/{params}')
+            self.assertEqual(len(response.data['results']), 20)
+            self.assertEqual(small_count, large_count, f'CategoryViewSet.products{params}')
+
+            small_count, response = self.count_queries(f'/api/products/?category={small.id}&{params[1:]}')
+            self.assertEqual(len(response.data['results']), 2)
+            large_count, response = self.count_queries(f'/api/products/?category={large.id}&{params[1:]}')
+            self.assertEqual(len(response.data['results']), 20)
+            self.assertEqual(small_count, large_count, f'/api/products/{params}')
+
+
+class BackfillProductSnapshotsTests(TestCase):
+    def test_backfill_moves_catalog_validators(self):
+        category = Category.objects.create(name='Backfill', slug='backfill')
+        product = Product.objects.create(name='Backfill product', slug='backfill-product', description='backfill',
+                                         category=category, price=100, stock=10)
+        Product.objects.create(name='Fresh product', slug='fresh-product', description='backfill',
+                               category=category, price=100, stock=10)
+        # A stale snapshot written without touching updated_at, as a raw update would
+        Product.objects.filter(pk=product.pk).update(category_summary={})
+        cache.clear()
+        response = self.client.get('/api/products/')
+
+        out = StringIO()
+        call_command('backfill_product_snapshots', stdout=out)
+        self.assertIn('for 1 products', out.getvalue())
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Product.objects.get(pk=product.pk).category_summary, category.summary())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are read with SQLite EXPLAIN QUERY PLAN')
+class QueryPlanTests(TestCase):
+    """Every query issued by the hot catalog, cart and order endpoints uses an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Plan Check', slug='plan-check')
+        cls.products = [
+            Product.objects.create(
+                name=f'Plan check {i}', slug=f'plan-check-{i}', description='plan check',
+                category=cls.category, price=100 + i, discount_price=50 if i % 2 else None,
+                is_featured=not i % 3, stock=10,
+            )
+            for i in range(5)
+        ]
+        cls.user = User.objects.create_user(username='plan-check', email='plan-check@example.com',
+                                            phone_number='+910000000000', password='plan-check')
+        cart = Cart.objects.create(user=cls.user)
+        CartItem.objects.create(cart=cart, product=cls.products[0], quantity=1)
+        Order.objects.create(user=cls.user, subtotal=100, total=150, shipping_address='-',
+                             shipping_city='-', shipping_state='-', shipping_zip_code='-',
+                             shipping_phone='-')
+
+    def setUp(self):
+        cache.clear()
+
+    def bad_plans(self, sql):
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[-1] for row in cursor.fetchall()]
+        bad = []
+        for line in plan:
+            match = FULL_SCAN_RE.search(line)
+            if match and match.group(1) in HOT_TABLES:
+                bad.append(line)
+            elif 'USE TEMP B-TREE FOR ORDER BY' in line and any(table in sql for table in HOT_TABLES):
+                bad.append(line)
+        return bad
+
+    def assert_plans_use_indexes(self, client, requests):
+        for method, url, params in requests:
+            with self.subTest(url=url, params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(client, method)(url, params)
+                self.assertLess(response.status_code, 400)
+                failures = [(query['sql'], plan) for query in queries.captured_queries
+                            for plan in self.bad_plans(query['sql'])]
+                self.assertEqual(failures, [])
+
+    def test_catalog_queries_use_indexes(self):
+        products = self.products
+        self.assert_plans_use_indexes(APIClient(), [
+            ('get', '/api/products/', {}),
+            ('get', '/api/products/', {'category': self.category.id}),
+            ('get', '/api/products/', {'ordering': 'price'}),
+            ('get', '/api/products/', {'ordering': '-final_price'}),
+            ('get', '/api/products/', {'ordering': '-rating'}),
+            ('get', '/api/products/', {'min_price': 60, 'max_price': 120, 'ordering': 'final_price'}),
+            ('get', '/api/products/', {'pagination': 'cursor'}),
+            ('get', '/api/products/featured/', {}),
+            ('get', '/api/products/on_sale/', {}),
+            ('get', f'/api/products/{products[0].slug}/', {}),
+            ('get', '/api/products/lookup/', {'ids': f'{products[1].id},{products[0].id}'}),
+            ('get', '/api/products/lookup/', {'slugs': f'{products[1].slug},{products[0].slug}'}),
+            ('get', f'/api/products/categories/{self.category.id}/products/', {}),
+        ])
+
+    def test_cart_and_order_queries_use_indexes(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assert_plans_use_indexes(client, [
+            ('get', '/api/cart/', {}),
+            ('post', '/api/cart/add_item/', {'product_id': self.products[1].id}),
+            ('get', '/api/orders/', {}),
+        ])
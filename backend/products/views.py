@@ -1,53 +1,182 @@
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
+from rest_framework.permissions import IsAdminUser
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Category, Product
 from .serializers import CategorySerializer, ProductSerializer, ProductListSerializer
+from .search import ProductSearchFilter
+from .filters import ProductFilter
+from .facets import compute_facets
+from .cache import cache_catalog_response, get_cache_stats
+from .conditional import conditional_catalog_response
+from .streaming import wants_stream, stream_json_array
+from .list_rows import prepare_list
+from nextbloom.fieldsets import Fieldset
+from nextbloom.pagination import StorefrontPagination
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     pagination_class = None  # Disable pagination for categories
+    product_pagination_class = StorefrontPagination
+
+    def get_conditional_queryset(self):
+        if self.action == 'products':
+            return Product.objects.filter(category_id=self.kwargs['pk'], is_active=True)
+        if self.action == 'retrieve':
+            return self.get_queryset().filter(pk=self.kwargs['pk'])
+        return self.get_queryset()
+
+    @conditional_catalog_response
+    @cache_catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=True, methods=['get'])
+    @conditional_catalog_response
+    @cache_catalog_response
     def products(self, request, pk=None):
         category = self.get_object()
         products = Product.objects.filter(category=category, is_active=True)
-        serializer = ProductListSerializer(products, many=True, context={'request': request})
-        return Response(serializer.data)
+        products, render = prepare_list(products, ProductListSerializer, self.get_serializer_context())
+        if wants_stream(request):
+            return stream_json_array(products, render)
+
+        paginator = self.product_pagination_class()
+        page = paginator.paginate_queryset(products, request, view=self)
+        return paginator.get_paginated_response([render(row) for row in page])
 
 
 class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductListSerializer
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'is_featured']
+    # Search runs last so relevance ordering can replace the default ordering
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
+    filterset_class = ProductFilter
     search_fields = ['name', 'description']
-    ordering_fields = ['price', 'rating', 'created_at']
+    ordering_fields = ['price', 'final_price', 'rating', 'created_at']
     ordering = ['-created_at']
+    # Upper bound on ids/slugs per bulk lookup
+    max_lookup_batch = 100
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            # Load only the columns, category and images the detail response renders
+            fieldset = Fieldset.from_request(self.request)
+            queryset = queryset.only(*ProductSerializer.required_columns(fieldset))
+            if fieldset.renders('category'):
+                queryset = queryset.select_related('category')
+            if fieldset.includes('images'):
+                queryset = queryset.prefetch_related('images')
+            return queryset
+        if self.action == 'featured':
+            return queryset.filter(is_featured=True)
+        if self.action == 'on_sale':
+            # Written as IS NOT NULL so it matches the on-sale partial index
+            return queryset.filter(discount_price__isnull=False)
+        return queryset
+
+    def get_conditional_queryset(self):
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return super().get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.filter_queryset(self.get_queryset())
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ProductSerializer
         return ProductListSerializer
 
+    def list_response(self, request):
+        """Filtered, paginated listing of get_queryset(), or a stream of all of it."""
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset, render = prepare_list(queryset, self.get_serializer_class(), self.get_serializer_context())
+        if wants_stream(request):
+            return stream_json_array(queryset, render)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([render(row) for row in page])
+        return Response([render(row) for row in queryset])
+
+    @conditional_catalog_response
+    @cache_catalog_response
+    def list(self, request, *args, **kwargs):
+        return self.list_response(request)
+
+    @conditional_catalog_response
+    @cache_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
     @action(detail=False, methods=['get'])
+    @conditional_catalog_response
+    @cache_catalog_response
     def featured(self, request):
-        featured_products = self.queryset.filter(is_featured=True)
-        serializer = self.get_serializer(featured_products, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.list_response(request)
 
     @action(detail=False, methods=['get'])
+    @conditional_catalog_response
+    @cache_catalog_response
     def on_sale(self, request):
-        on_sale_products = self.queryset.exclude(discount_price__isnull=True)
-        serializer = self.get_serializer(on_sale_products, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.list_response(request)
+
+    @action(detail=False, methods=['get'])
+    @cache_catalog_response
+    def lookup(self, request):
+        """
+        Fetch many products at once with ``?ids=1,2,3`` or ``?slugs=a,b``.
+        Results come back in the requested order; keys that match no active
+        product are listed under ``missing``.
+        """
+        ids = request.query_params.get('ids')
+        slugs = request.query_params.get('slugs')
+        if bool(ids) == bool(slugs):
+            return Response({'error': 'Provide either ids or slugs'}, status=status.HTTP_400_BAD_REQUEST)
+
+        field = 'id' if ids else 'slug'
+        # Drop blanks and duplicates, keeping the requested order
+        keys = list(dict.fromkeys(key.strip() for key in (ids or slugs).split(',') if key.strip()))
+        if len(keys) > self.max_lookup_batch:
+            return Response({'error': f'At most {self.max_lookup_batch} products can be looked up at once'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if field == 'id':
+            try:
+                keys = list(dict.fromkeys(int(key) for key in keys))
+            except ValueError:
+                return Response({'error': 'ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset().filter(**{f'{field}__in': keys}).order_by()
+        queryset, render = prepare_list(queryset, self.get_serializer_class(), self.get_serializer_context(),
+                                        extra_columns=(field,))
+        found = {}
+        for row in queryset:
+            key = row[field] if isinstance(row, dict) else getattr(row, field)
+            found[key] = render(row)
+        return Response({
+            'results': [found[key] for key in keys if key in found],
+            'missing': [key for key in keys if key not in found],
+        })
+
+    @action(detail=False, methods=['get'])
+    @cache_catalog_response
+    def facets(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(compute_facets(queryset))
 
+    @action(detail=False, methods=['get'], url_path='cache-stats', permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        return Response(get_cache_stats())
@@ -0,0 +1,59 @@
+"""
+Composite storefront endpoints.
+
+``/api/storefront/home/`` returns everything the home page renders in one
+request: the active categories, the newest featured and on-sale products,
+and the signed-in user's cart summary. The catalog sections are the same for
+every visitor, so they are cached under the catalog version. The cart
+summary is per user and comes from its own short-lived cache.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from cart.summary import get_cart_summary
+from nextbloom.fieldsets import Fieldset
+from products.cache import catalog_cache_key
+from products.list_rows import prepare_list
+from products.models import Category, Product
+from products.serializers import CategorySerializer, ProductListSerializer
+
+HOME_SECTION_SIZE = 8
+
+
+def build_home_catalog(request):
+    """
+    The anonymous part of the home page. ``?fields=`` and ``?expand=`` apply
+    to the product entries.
+    """
+    context = {'request': request}
+    categories = CategorySerializer(
+        Category.objects.filter(is_active=True), many=True, context=context, fieldset=Fieldset(),
+    ).data
+
+    def section(queryset):
+        rows, render = prepare_list(queryset.order_by('-created_at'), ProductListSerializer, context)
+        return [render(row) for row in rows[:HOME_SECTION_SIZE]]
+
+    products = Product.objects.filter(is_active=True)
+    return {
+        'categories': list(categories),
+        'featured': section(products.filter(is_featured=True)),
+        'on_sale': section(products.filter(discount_price__isnull=False)),
+    }
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def home(request):
+    key = catalog_cache_key(request, prefix='home')
+    data = cache.get(key)
+    if data is None:
+        data = build_home_catalog(request)
+        cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+
+    cart = None
+    if request.user.is_authenticated:
+        cart = get_cart_summary(request.user)
+    return Response({**data, 'cart': cart})
@@ -29,46 +29,27 @@ export default function Home() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetchFeaturedProducts()
-    fetchCategories()
+    fetchHome()
   }, [])
 
-  const fetchFeaturedProducts = async () => {
+  const fetchHome = async () => {
     try {
-      console.log('Fetching featured products from:', `${API_URL}/products/featured/`)
-      const response = await axios.get(`${API_URL}/products/featured/`)
-      console.log('Featured products response:', response.data)
-      if (Array.isArray(response.data)) {
-        setFeaturedProducts(response.data.slice(0, 8))
-      } else {
-        console.error('Invalid featured products response:', response.data)
-        setFeaturedProducts([])
-      }
+      // Categories and featured products come from one composite request
+      const response = await axios.get(`${API_URL}/storefront/home/`)
+      const featuredData = response.data.featured
+      const categoriesData = response.data.categories
+      setFeaturedProducts(Array.isArray(featuredData) ? featuredData.slice(0, 8) : [])
+      setCategories(Array.isArray(categoriesData) ? categoriesData.slice(0, 6) : [])
     } catch (error: any) {
-      console.error('Error fetching featured products:', error)
+      console.error('Error fetching home page data:', error)
       console.error('Error details:', error.response?.data || error.message)
       setFeaturedProducts([])
+      setCategories([])
     } finally {
       setLoading(false)
     }
   }
 
-  const fetchCategories = async () => {
-    try {
-      console.log('Fetching categories from:', `${API_URL}/products/categories/`)
-      const response = await axios.get(`${API_URL}/products/categories/`)
-      console.log('Categories response:', response.data)
-      // Categories are not paginated, so response.data is directly the array
-      const categoriesData = response.data.results || response.data || []
-      const categoriesArray = Array.isArray(categoriesData) ? categoriesData : []
-      setCategories(categoriesArray.slice(0, 6))
-    } catch (error: any) {
-      console.error('Error fetching categories:', error)
-      console.error('Error details:', error.response?.data || error.message)
-      setCategories([]) // Set empty array on error
-    }
-  }
-
   return (
     <div className="min-h-screen flex flex-col">
       <Navbar />